@@ -0,0 +1,236 @@
+""" Analysis of generated mazes: connectivity, distances to the exit, dead ends and corridors
+    Everything is computed with numpy over the whole grid at once, so it can check every level,
+    also the 5000x5000 ones: components are labelled by union-find on arrays (roots hooked to smaller roots,
+    then pointer jumping), the distance field is a breadth first search moving the whole frontier in one step.
+
+    usage: python Analysis.py --width 2000 --height 2000 --generator walk --seeds 5
+    prints the report of every level and the time it took
+"""
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+
+
+def label_components(open_cells):
+    """ Connected components of open cells (moves up, down, left, right)
+
+    open_cells: 2D np.array of bools
+    returns (labels, sizes): labels - np.array of int32 of the same shape, component number of every open cell,
+            -1 for closed ones; components are numbered in the order of their first cell (row by row)
+            sizes - np.array of cells in every component
+    """
+    # cells of a row next to each other are joined at once: nodes of union-find are runs of open cells
+    starts = open_cells.copy()
+    starts[:, 1:] &= ~open_cells[:, :-1]
+    run = np.cumsum(starts).reshape(open_cells.shape) - 1
+    count = int(starts.sum())
+    down = open_cells[:-1, :] & open_cells[1:, :]
+    a, b = run[:-1, :][down], run[1:, :][down]
+    parent = np.arange(count)
+    while len(a):
+        root_a, root_b = parent[a], parent[b]
+        apart = root_a != root_b
+        a, b = a[apart], b[apart]
+        # bigger root of every edge is hooked to the smaller one (any of them if there are more);
+        # parents only get smaller, so there are no cycles
+        root_a, root_b = root_a[apart], root_b[apart]
+        parent[np.maximum(root_a, root_b)] = np.minimum(root_a, root_b)
+        # pointer jumping until every run points to its root
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+    # every root is the first run of its component
+    is_root = parent == np.arange(count)
+    numbers = (np.cumsum(is_root) - 1)[parent]
+    labels = np.full(open_cells.shape, -1, dtype=np.int32)
+    labels[open_cells] = numbers[run[open_cells]]
+    return labels, np.bincount(labels[open_cells], minlength=int(is_root.sum()))
+
+
+def distance_field(open_cells, target):
+    """ Steps from every open cell to target (no turning costs, no wall pushing)
+
+    open_cells: 2D np.array of bools
+    target: coordinates (y, x); an open cell
+    returns np.array of int32 of the same shape, -1 where target can't be reached
+    """
+    height, width = open_cells.shape
+    # one closed cell around the grid, so a step never wraps to another row
+    padded = np.zeros((height + 2, width + 2), dtype=bool)
+    padded[1:-1, 1:-1] = open_cells
+    passable = padded.ravel()
+    shifts = np.array([-(width + 2), width + 2, -1, 1])
+    dist = np.full(passable.size, -1, dtype=np.int32)
+    # scratch for removing repeated cells of the frontier without sorting: only the last copy keeps its place
+    owner = np.empty(passable.size, dtype=np.int64)
+    frontier = np.array([(target[0] + 1) * (width + 2) + target[1] + 1])
+    dist[frontier] = 0
+    step = 0
+    while len(frontier):
+        step += 1
+        around = (frontier[:, None] + shifts).ravel()
+        around = around[passable[around] & (dist[around] == -1)]
+        places = np.arange(len(around))
+        owner[around] = places
+        frontier = around[owner[around] == places]
+        dist[frontier] = step
+    return dist.reshape(padded.shape)[1:-1, 1:-1]
+
+
+class Maze_analysis:
+    """ Connectivity and shape of a maze
+        Hero and trolls are not on the grid (see Game.occupancy), so they don't block anything here
+
+    Attributes:
+        shape: (height, width)
+        exit: coordinates of the exit
+        labels: np.array of int32; component of every path and exit cell, -1 for walls (label_components)
+        sizes: np.array; number of cells of every component
+        exit_component: int; component of the exit, -1 if there is no exit
+        exit_distance: np.array of int32; steps to the exit from every cell, -1 if it can't be reached
+                       without pushing walls
+        open_cells: int; number of path and exit cells
+        dead_ends, corridors, junctions: int; path cells with 1, 2 and more than 2 open neighbours
+        corridor_length: float; mean length of corridor segments (cells with 2 open neighbours in a row)
+    """
+    def __init__(self, grid, exit=None):
+        """ grid: np.array of maze codes (Maze.as_array)
+            exit: coordinates of the exit, the cell with code 2 if None
+        """
+        if exit is None or not len(exit):
+            exits = np.argwhere(grid == 2)
+            exit = tuple(int(v) for v in exits[0]) if len(exits) else None
+        self.shape = grid.shape
+        self.exit = tuple(exit) if exit is not None else None
+        open_cells = grid != 1
+        self.open_cells = int(open_cells.sum())
+        self.labels, self.sizes = label_components(open_cells)
+        if self.exit is not None:
+            self.exit_component = int(self.labels[self.exit])
+            self.exit_distance = distance_field(open_cells, self.exit)
+        else:
+            self.exit_component = -1
+            self.exit_distance = np.full(grid.shape, -1, dtype=np.int32)
+        padded = np.zeros((grid.shape[0] + 2, grid.shape[1] + 2), dtype=np.int8)
+        padded[1:-1, 1:-1] = open_cells
+        neighbours = padded[:-2, 1:-1] + padded[2:, 1:-1] + padded[1:-1, :-2] + padded[1:-1, 2:]
+        paths = grid == 0
+        self.dead_ends = int((paths & (neighbours == 1)).sum())
+        corridor = paths & (neighbours == 2)
+        self.corridors = int(corridor.sum())
+        self.junctions = int((paths & (neighbours > 2)).sum())
+        # corridor cells make chains (a ring of corridor cells only is the one exception): chains = cells - links
+        links = int((corridor[:, :-1] & corridor[:, 1:]).sum() + (corridor[:-1, :] & corridor[1:, :]).sum())
+        segments = self.corridors - links
+        self.corridor_length = self.corridors / segments if segments else 0.0
+
+    def component_mask(self, component=None):
+        """ Flat np.array of bools, True for cells of the component (the exit one if None)"""
+        if component is None:
+            component = self.exit_component
+        return (self.labels == component).ravel()
+
+    def connected(self, a, b):
+        """ Tells if one can walk from a to b without pushing walls"""
+        return self.labels[a] != -1 and self.labels[a] == self.labels[b]
+
+    def reachable_share(self):
+        """ Part of the open cells from which the exit can be reached"""
+        if self.exit_component == -1 or not self.open_cells:
+            return 0.0
+        return float(self.sizes[self.exit_component]) / self.open_cells
+
+    def exit_candidates(self):
+        """ Border cells next to the biggest component: the exit there can be reached from most of the maze
+            returns np.array of (y, x) rows
+        """
+        if not len(self.sizes):
+            return np.empty((0, 2), dtype=np.int64)
+        biggest = int(np.argmax(self.sizes))
+        height, width = self.shape
+        inside = self.labels == biggest
+        candidates = []
+        for border, (y, x) in ((inside[1, 1:-1], (0, 1)), (inside[-2, 1:-1], (height - 1, 1)),
+                               (inside[1:-1, 1], (1, 0)), (inside[1:-1, -2], (1, width - 1))):
+            cells = np.flatnonzero(border)
+            if y in (0, height - 1):
+                candidates.append(np.stack([np.full(len(cells), y), cells + x], axis=1))
+            else:
+                candidates.append(np.stack([cells + y, np.full(len(cells), x)], axis=1))
+        return np.concatenate(candidates)
+
+    def difficulty(self, hero, trolls=()):
+        """ Rough score for comparing levels of one size; higher is harder
+            grows with the way to the exit (log of its steps), with how winding it is (steps per Manhattan
+            distance), with the share of dead ends and with trolls close enough to catch the hero on the way
+            inf if the exit can't be reached without pushing walls
+        """
+        steps = int(self.exit_distance[hero])
+        if steps == -1:
+            return math.inf
+        straight = max(1, abs(hero[0] - self.exit[0]) + abs(hero[1] - self.exit[1]))
+        threats = sum(1 for y, x in trolls if abs(y - hero[0]) + abs(x - hero[1]) <= steps)
+        dead_end_share = self.dead_ends / max(1, self.open_cells)
+        return math.log2(1 + steps) * math.sqrt(steps / straight) * (1 + dead_end_share) * math.sqrt(1 + threats)
+
+    def problems(self, hero=None, min_reachable=0.5):
+        """ Returns list of reasons to reject the level, empty for a good one
+
+        hero: coordinates of the hero or None
+        min_reachable: smallest reachable_share accepted
+        """
+        problems = []
+        if self.exit_component == -1:
+            problems.append('no exit')
+        elif self.sizes[self.exit_component] < 2:
+            problems.append('exit walled in')
+        elif hero is not None and not self.connected(hero, self.exit):
+            problems.append('exit unreachable from the hero')
+        if self.reachable_share() < min_reachable:
+            problems.append('exit reachable from %.0f%% of the maze' % (100 * self.reachable_share()))
+        return problems
+
+    def report(self, hero=None, trolls=()):
+        """ Dict of numbers for logs and the command line"""
+        reachable = self.exit_distance[self.exit_distance >= 0]
+        report = {'shape': list(self.shape),
+                  'open_cells': self.open_cells,
+                  'components': len(self.sizes),
+                  'reachable_share': round(self.reachable_share(), 4),
+                  'max_exit_distance': int(reachable.max()) if len(reachable) else -1,
+                  'dead_ends': self.dead_ends,
+                  'corridors': self.corridors,
+                  'junctions': self.junctions,
+                  'corridor_length': round(self.corridor_length, 2),
+                  'problems': self.problems(hero)}
+        if hero is not None:
+            report['hero_exit_distance'] = int(self.exit_distance[hero])
+            report['difficulty'] = round(self.difficulty(hero, trolls), 2)
+        return report
+
+
+if __name__ == '__main__':
+    from Game import Game
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--width', type=int, default=60)
+    parser.add_argument('--height', type=int, default=25)
+    parser.add_argument('--trolls', type=int, default=15)
+    parser.add_argument('--generator', default='classic')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--seeds', type=int, default=1, help='analyse levels of seeds seed .. seed + N - 1')
+    args = parser.parse_args()
+
+    for seed in range(args.seed, args.seed + args.seeds):
+        game = Game(args.width, args.height, args.trolls, generator=args.generator, seed=seed)
+        start = time.perf_counter()
+        analysis = Maze_analysis(game.map.as_array(), game.map.exit)
+        report = analysis.report(game.hero.coor, [troll.coor for troll in game.trolls])
+        report['seed'] = seed
+        report['seconds'] = round(time.perf_counter() - start, 4)
+        print(json.dumps(report))
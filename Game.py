@@ -0,0 +1,800 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Jun 11 12:20:17 2018
+
+@author: Kukiss7
+exc: https://www.reddit.com/r/dailyprogrammer/comments/4vrb8n/weekly_25_escape_the_trolls/
+implemented: working game in tkinker environment, trolls find their paths to hero, Text_Map gives information on the screen, random maps
+
+Game core without any tkinter code; Trolls-app.py is the front end
+Headless use: game = Game(60, 25); game.start(); state = game.step('up')
+"""
+import string
+import random
+import numpy as np
+from Analysis import Maze_analysis
+from Maze import Maze
+from Occupancy import Occupancy
+from Pathfinding import Cluster_graph, Distance_field, astar, passable_cells, rejoin
+from Scheduler import Troll_scheduler
+
+
+class Game:
+    """ Game representation
+        New turn with every player move (Game.step)
+
+    Attributes:
+        map: Maze object which is based on np.array; terrain only, changed just by push_wall
+        hero: Hero object; player
+        occupancy: Occupancy object; where hero and trolls stand, layer on top of the map
+        trolls: list of Troll objects
+        top_layer_on: boolean; Tell if there is a message on the screen
+        top_layer_map: Text_map object; it is for writing a message in the middle of the screen
+        frame: np.array of ascii codes; cached picture of the game, patched with dirty cells every turn
+        dirty: set of coordinates; cells changed since the frame was last updated
+        full_redraw: boolean; whole frame has to be built again (new message, restart)
+        turn: int; actual turn
+        winning_turn: int; turn upon winning
+        status: 0,1,2,3  - pre_start, in_progress, win, lost
+        seed: int or None; the same seed and the same hero actions give the same game
+        random: random.Random; source of all randomness of the game
+        terrain_version: int; changed with every push_wall, cached terrain data is checked against it
+        planner: 'field' - trolls read moves from one Distance_field per turn
+                 'repair' - every troll keeps its own plan and repairs it (Troll.repair_plan)
+                 'hpa' - like 'repair', but plans are searched on cluster_graph; for big mazes
+        cluster_graph: Cluster_graph or None; portals of the map for 'hpa' planner, built by the first search
+                       (see hpa_graph), updated by push_wall
+        field: Distance_field of the last turn; used again while hero and terrain stay the same,
+               its buffers are used for the next targets too (Distance_field.reset)
+        new_walls: set of coordinates; walls pushed since trolls planned last time
+        new_paths: set of coordinates; cells opened by pushing walls since trolls planned last time
+        scheduler: Troll_scheduler or None; level of detail of troll AI, None - every troll moves exactly
+        analysis: Maze_analysis or None; connectivity and shape of the map when the game started (analyze)
+        spawn_mask: flat np.array of bools or None; cells hero and trolls may appear on (Hero.appear)
+        profiler: Turn_profiler or None; switched on and off at any time, costs nothing when None
+        stats_map: Text_map or None; stats shown in the top left corner
+    """
+
+    directions = {'up': 3, 'down': 4, 'left': 5, 'right': 6}
+    grid_elements = {i: j for i, j in enumerate([' ', '#', 'X', '^', 'v', '<', '>', 't'])}
+    # ascii code of a sign for every grid value; '?' if not found in grid_elements
+    grid_lut = np.full(256, ord('?'), dtype=np.uint8)
+    grid_lut[:len(grid_elements)] = np.frombuffer(''.join(grid_elements.values()).encode('ascii'), dtype=np.uint8)
+
+    def __init__(self, map_width, map_height, trolls=15, complexity=0.75, density=0.75, generator='classic',
+                 seed=None, planner='field', spawn_distance=0, maze=None, populate=True,
+                 near_radius=None, far_every=8, ai_budget_ms=None, analyze=False):
+        """ maze: Maze object to play on instead of generating one (map_width, map_height and maze settings
+                  are not used then)
+            populate: boolean; False leaves hero off the map and spawns no trolls - for restoring saved games
+            near_radius, far_every, ai_budget_ms: Troll_scheduler settings; with both near_radius
+                  and ai_budget_ms None there is no scheduler
+            analyze: boolean; map is checked before anyone appears on it, see Game.analyze_level
+        """
+        self.seed = seed
+        self.planner = planner
+        self.random = random.Random(seed)
+        if maze is None:
+            maze = Maze(map_width, map_height, complexity, density)
+            maze.fill_borders()
+            maze.make_aisles(generator, self.random.getrandbits(32))
+            maze.set_exit(self.random.getrandbits(32))
+        self.map = maze
+        self.analysis = None
+        self.spawn_mask = None
+        if analyze:
+            self.analyze_level()
+        self.occupancy = Occupancy()
+        self.hero = Hero(self.random)
+        if populate:
+            self.hero.appear(self)
+        self.trolls = []
+        self.top_layer_on = False
+        self.top_layer_map = Text_map()
+        self.frame = None
+        self.dirty = set()
+        self.full_redraw = True
+        self.turn = 0
+        self.winning_turn = -1
+        self.status = 0
+        self.terrain_version = 0
+        self.passable_cache = (-1, None)
+        self.field = None
+        self.field_key = None
+        self.new_walls = set()
+        self.new_paths = set()
+        self.cluster_graph = None
+        self.scheduler = None
+        if near_radius is not None or ai_budget_ms is not None:
+            self.scheduler = Troll_scheduler(self, near_radius, far_every, ai_budget_ms)
+        self.profiler = None
+        self.stats_map = None
+        if populate:
+            self.spawn_trolls(trolls, spawn_distance)
+            self.refresh_entities()
+
+    def __str__(self):
+        return self.render_frame().tobytes().decode('ascii')
+
+    def render_frame(self):
+        """
+            Main "graphics" engine as the game is built without real graphics - just text
+            Codes from the map (base labirynth is made with integers 0,1,2) are turned into
+            ascii bytes with one Game.grid_lut lookup, hero and trolls are pasted from occupancy layer,
+            Text_map message is pasted as ready block of chars
+            returns np.array of ascii codes; every row ends with a new line sign
+        """
+        frame = np.empty((self.map.shape[0], self.map.shape[1] + 1), dtype=np.uint8)
+        frame[:, :-1] = Game.grid_lut[self.map.grid]
+        frame[:, -1] = ord('\n')
+        if self.occupancy.cells:
+            ys, xs = np.array(list(self.occupancy.cells)).T
+            codes = [self.entities_value(entities) for entities in self.occupancy.cells.values()]
+            frame[ys, xs] = Game.grid_lut[np.array(codes, dtype=np.uint8)]
+        # pasting stats and top_layer with message for player if needed
+        for y_start, x_start, y_end, x_end, text_map in self.overlays():
+            frame[y_start: y_end, x_start: x_end] = text_map.chars
+        return frame
+
+    def overlays(self):
+        """ Returns list of (y_start, x_start, y_end, x_end, Text_map) pasted over the map, in painting order
+            stats in the top left corner, message for the player in the middle
+        """
+        overlays = []
+        if self.stats_map is not None:
+            overlays.append((1, 1, 1 + self.stats_map.shape[0], 1 + self.stats_map.shape[1], self.stats_map))
+        if self.top_layer_on:
+            overlays.append(self.top_layer_box() + (self.top_layer_map,))
+        return overlays
+
+    def top_layer_box(self):
+        """ Returns (y_start, x_start, y_end, x_end) of the message in the middle of the screen
+        """
+        top_layer_x_start = (self.map.shape[1] - self.top_layer_map.shape[1]) // 2
+        top_layer_y_start = (self.map.shape[0] - self.top_layer_map.shape[0]) // 2
+        return (top_layer_y_start, top_layer_x_start,
+                top_layer_y_start + self.top_layer_map.shape[0], top_layer_x_start + self.top_layer_map.shape[1])
+
+    def mark_dirty(self, *coors):
+        self.dirty.update(coors)
+
+    def show_stats(self, text=None):
+        """ Puts a framed text (profiler stats) in the top left corner of the screen; None hides it
+        """
+        if self.stats_map is not None:
+            self.mark_dirty(*((y, x) for y in range(1, 1 + self.stats_map.shape[0])
+                              for x in range(1, 1 + self.stats_map.shape[1])))
+        self.stats_map = None
+        if text:
+            self.stats_map = Text_map(text=text)
+            self.stats_map.make_frame()
+            self.stats_map.add_text()
+            self.stats_map.make_chars()
+            self.mark_dirty(*((y, x) for y in range(1, 1 + self.stats_map.shape[0])
+                              for x in range(1, 1 + self.stats_map.shape[1])))
+
+    def update_frame(self):
+        """ Patches cached frame with cells changed since the last update
+            returns list of [y, x_start, x_end] runs of changed signs in rows
+                    or None if the whole frame was built again
+        """
+        if self.frame is None or self.full_redraw:
+            self.frame = self.render_frame()
+            self.full_redraw = False
+            self.dirty.clear()
+            return None
+        cells = sorted(self.dirty)
+        self.dirty.clear()
+        if not cells:
+            return []
+        ys, xs = np.array(cells).T
+        signs = Game.grid_lut[np.array([self.cell_value(coor) for coor in cells], dtype=np.uint8)]
+        # signs under stats and messages stay hidden
+        for y_start, x_start, y_end, x_end, text_map in self.overlays():
+            under = (ys >= y_start) & (ys < y_end) & (xs >= x_start) & (xs < x_end)
+            signs[under] = text_map.chars[ys[under] - y_start, xs[under] - x_start]
+        self.frame[ys, xs] = signs
+        runs = []
+        for y, x in cells:
+            if runs and runs[-1][0] == y and runs[-1][2] == x:
+                runs[-1][2] = x + 1
+            else:
+                runs.append([y, x, x + 1])
+        return runs
+
+    def start(self):
+        self.status = 1
+
+    def step(self, action=None):
+        """ Plays one turn: hero action (one of Game.directions keys, None for waiting) and trolls moves
+
+        returns state of the game (see Game.state)
+        """
+        if self.status == 0:
+            self.start()
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.begin_turn(self.turn, len(self.trolls))
+        if action is not None:
+            self.hero_action(action)
+        if profiler is not None:
+            profiler.lap('hero_action')
+        self.new_turn()
+        return self.state()
+
+    def state(self):
+        """ Returns dict with turn, status, hero coordinates and direction and trolls coordinates
+        """
+        return {'turn': self.turn,
+                'status': self.status,
+                'hero': self.hero.coor,
+                'direction': self.hero.direction,
+                'trolls': [troll.coor for troll in self.trolls]}
+
+    def new_turn(self):
+        """ Controls every new turn
+            calculates trolls moves, refreshes map, checks if game is lost
+            Nothing is rendered here; front end asks for the frame when it needs it
+        """
+        profiler = self.profiler
+        self.trolls_action()
+        if profiler is not None:
+            profiler.lap('trolls_action')
+        self.refresh_entities()
+        self.turn += 1
+        if self.status != 3 and self.is_lost():
+            self.lose()
+        if profiler is not None:
+            profiler.lap('refresh_entities')
+
+    def hero_action(self, direction):
+        """ Controls hero move after given key press
+            Checks if hero should turn himself or go in given direction if he's already turned there
+            Win/Lose is also checked at the end
+        """
+        if self.status == 3:
+            pass
+        elif not self.hero.turn(direction):
+            if self.check_space(self.hero.coor, direction) == 0:
+                if self.hero.move(direction):
+                    return True
+            elif self.check_space(self.hero.coor, direction) == 1:
+                if self.check_wall(direction) == 0:
+                    self.push_wall(direction)
+                    self.hero.move(direction)
+            elif self.check_space(self.hero.coor, direction) == 2:
+                self.win()
+            elif self.check_space(self.hero.coor, direction) == 7:  # 7 means trolls
+                self.lose()
+
+    def analyze_level(self):
+        """ Makes self.analysis (Maze_analysis) of the map
+            Exit walled in or cut off from the biggest part of the maze is moved next to that part,
+            then hero and trolls appear only where the exit can be reached from without pushing walls,
+            so no troll starts trapped in a pocket and the hero can always walk out
+        """
+        analysis = Maze_analysis(self.map.as_array(), self.map.exit)
+        sizes = analysis.sizes
+        if len(sizes) and (analysis.exit_component == -1 or sizes[analysis.exit_component] < sizes.max()):
+            candidates = analysis.exit_candidates()
+            if len(candidates):
+                y, x = candidates[self.random.randrange(len(candidates))]
+                self.map.move_exit(int(y), int(x))
+                analysis = Maze_analysis(self.map.as_array(), self.map.exit)
+        self.analysis = analysis
+        if analysis.exit_component != -1:
+            self.spawn_mask = analysis.component_mask()
+
+    def difficulty(self):
+        """ Maze_analysis.difficulty of the level as it is now (hero and trolls where they stand), None without analysis
+            walls pushed since the analysis are not taken into account
+        """
+        if self.analysis is None:
+            return None
+        return self.analysis.difficulty(self.hero.coor, [troll.coor for troll in self.trolls])
+
+    def spawn_trolls(self, n, min_distance=0):
+        """ Iterates through self.trolls list and spawns them.
+            n: number of trolls
+            min_distance: int; trolls appear at least that far (Manhattan) from the hero
+        """
+        for i in range(n):
+            troll = Troll(self)
+            troll.appear(self, self.hero.coor if min_distance else None, min_distance)
+            self.trolls.append(troll)
+
+    def trolls_action(self):
+        """ Iterates through self.trolls list and controlls them.
+            Every troll moves towards the hero. With 'field' planner instead of every troll running
+            its own search one Distance_field from the hero is built per turn and trolls read their moves from it,
+            with 'repair' planner trolls follow their own plans, repaired after hero moves and pushed walls
+            With a scheduler only some trolls move exactly, see Troll_scheduler
+        """
+        if self.scheduler is not None:
+            new_walls, self.new_walls = self.new_walls, set()
+            new_paths, self.new_paths = self.new_paths, set()
+            moves = self.scheduler.directions(new_walls, new_paths)
+        elif self.planner in ('repair', 'hpa'):
+            new_walls, self.new_walls = self.new_walls, set()
+            new_paths, self.new_paths = self.new_paths, set()
+            for troll in self.trolls:
+                troll.repair_plan(new_walls, new_paths=new_paths)
+            moves = [(troll, troll.planned_direction()) for troll in self.trolls]
+        else:
+            field = self.troll_field()
+            moves = [(troll, field.next_direction(troll.coor, troll.direction)) for troll in self.trolls]
+        for troll, direction in moves:
+            if direction is None:
+                continue  # troll is trapped
+            if troll.turn(direction):
+                continue
+            if self.troll_at(Game.new_coor(troll.coor, direction)):
+                continue  # other troll stands there; waiting
+            troll.move(direction)
+
+    def troll_field(self, trolls=None, max_expansions=None):
+        """ Distance_field from the hero covering trolls (all if None); the last one is used again if it still fits
+            max_expansions: int or None; limit of the search, trolls beyond it are not covered
+        """
+        sources = [(troll.coor, troll.direction) for troll in (self.trolls if trolls is None else trolls)]
+        key = (self.hero.coor, self.terrain_version)
+        field = self.field
+        if field is None:
+            field = self.field = Distance_field(self.map.grid, self.hero.coor, self.passable())
+        elif self.field_key != key:
+            # buffers of the field are used again; only states reached by the last search are cleared
+            field.reset(self.hero.coor, self.passable())
+        self.field_key = key
+        if not field.covers(sources):
+            # the same target: search goes on where it stopped
+            expansions = field.build(sources, max_expansions)
+            if self.profiler is not None:
+                self.profiler.count('field_expansions', expansions)
+        return field
+
+    def hpa_graph(self):
+        """ Cluster_graph of the map for 'hpa' planner; built on the first search, as it reads the whole map
+        """
+        if self.cluster_graph is None:
+            self.cluster_graph = Cluster_graph(self.map.grid, passable=self.passable())
+        return self.cluster_graph
+
+    def passable(self):
+        """ Flat bytearray of cells trolls can walk on (Pathfinding.passable_cells); push_wall patches it in place,
+            so the same object is kept by the searches (Distance_field, Cluster_graph) during the whole game
+        """
+        if self.passable_cache[0] != self.terrain_version:
+            self.passable_cache = (self.terrain_version, passable_cells(self.map.grid))
+        return self.passable_cache[1]
+
+    def clear_trolls(self):
+        """ Deletes all trolls from the game.
+        """
+        for troll in self.trolls:
+            self.occupancy.remove(troll, troll.coor)
+        self.trolls.clear()
+
+    def check_space(self, coor, direction, length=1):
+        """ Checks space in given direction from the given coordinates
+
+        length: int; tells how far we are checking
+        returns value of a grid: int: 0-7"""
+        assert direction in list(Game.directions.keys())
+        new_coor = Game.new_coor(coor, direction, length)
+        if not (0 <= new_coor[0] < self.map.shape[0] and 0 <= new_coor[1] < self.map.shape[1]):
+            return 1  # looking outside the map
+        return self.cell_value(new_coor)
+
+    def cell_value(self, coor):
+        """ Value of a grid in coor: hero or troll if anybody stands there, map otherwise
+        """
+        entities = self.occupancy.at(coor)
+        if entities:
+            return self.entities_value(entities)
+        return self.map.grid[coor]
+
+    def entities_value(self, entities):
+        """ Grid value for a list of entities standing on one cell; trolls cover the hero
+        """
+        for entity in entities:
+            if isinstance(entity, Troll):
+                return 7
+        if self.status == 3:
+            return self.map.grid[self.hero.coor]  # hero has been eaten
+        return Game.directions[self.hero.direction]
+
+    def sprites(self, y_start=0, x_start=0, y_end=None, x_end=None, covered=None):
+        """ Hero and trolls inside the rectangle (whole map without y_end) for front ends animating moves
+            returns list of (key, y, x, code); key is the same for an entity through the game,
+            y and x are relative to the rectangle, code is the grid value (hero sign or 7)
+
+        covered: list of (y_start, x_start, y_end, x_end) relative to the rectangle; entities there are hidden,
+                 Game.overlays if None
+        """
+        if y_end is None:
+            cells = self.occupancy.cells
+        else:
+            cells = self.occupancy.in_rect(y_start, x_start, y_end, x_end)
+        if covered is None:
+            covered = [overlay[:4] for overlay in self.overlays()]
+        sprites = []
+        for (y, x), entities in cells.items():
+            y, x = y - y_start, x - x_start
+            if any(top <= y < bottom and left <= x < right for top, left, bottom, right in covered):
+                continue
+            for entity in entities:
+                if isinstance(entity, Troll):
+                    sprites.append((id(entity), y, x, 7))
+                elif self.status != 3:  # eaten hero isn't shown
+                    sprites.append((id(entity), y, x, Game.directions[entity.direction]))
+        return sprites
+
+    def troll_at(self, coor):
+        return any(isinstance(entity, Troll) for entity in self.occupancy.at(coor))
+
+    def check_wall(self, direction):
+        """ Checks a space in given direction from the hero
+            returns value of a grid: int: 0-7
+        """
+        return self.check_space(self.hero.coor, direction, 2)
+
+    def push_wall(self, direction):
+        """ Moves a wall near hero in given direction
+        """
+        self.mark_dirty(Game.new_coor(self.hero.coor, direction), Game.new_coor(self.hero.coor, direction, 2))
+        if self.passable_cache[0] == self.terrain_version:
+            # two cells changed; the cached passable cells are patched in place instead of being built again
+            passable = self.passable_cache[1]
+            width = self.map.shape[1]
+            (y, x), (wall_y, wall_x) = (Game.new_coor(self.hero.coor, direction, length) for length in (1, 2))
+            passable[y * width + x] = 1
+            passable[wall_y * width + wall_x] = 0
+            self.passable_cache = (self.terrain_version + 1, passable)
+        self.terrain_version += 1
+        self.new_walls.add(Game.new_coor(self.hero.coor, direction, 2))
+        self.new_paths.add(Game.new_coor(self.hero.coor, direction))
+        # add_obj keeps the index of free cells (Maze.free) up to date
+        self.map.add_obj(0, *Game.new_coor(self.hero.coor, direction))
+        self.map.add_obj(1, *Game.new_coor(self.hero.coor, direction, 2))
+        if self.cluster_graph is not None:
+            self.cluster_graph.update([Game.new_coor(self.hero.coor, direction, length) for length in (1, 2)],
+                                      self.passable())
+
+    def refresh_entities(self):
+        """ Cells where hero or trolls came or left (Occupancy.changed) become dirty
+            hero cell too, as he might have turned
+        """
+        self.mark_dirty(*self.occupancy.changed)
+        self.occupancy.changed.clear()
+        self.mark_dirty(self.hero.coor)
+
+    def win(self):
+        """ After winning procedures:
+            set Game.status, give a message to the player, set winning turn, clear trolls
+        """
+        self.top_layer_on = True
+        self.status = 2
+        # self.top_layer_map.clear_all()
+        if self.turn - self.winning_turn == 1:
+            self.change_top_layer(text="Seriously...You've already won\nR for restart")
+        else:
+            self.winning_turn = self.turn
+            self.change_top_layer(text='You won!!!\nR for restart')
+        self.clear_trolls()
+
+    def is_lost(self):
+        """ Check if game is lost: does any troll stand on hero's cell
+        """
+        return self.troll_at(self.hero.coor)
+
+    def lose(self):
+        """ After losing procedures:
+            set Game.status, give a message to player
+        """
+        self.top_layer_on = True
+        self.status = 3
+        self.change_top_layer(text="You've been eaten\nR for restart")
+
+    def change_top_layer(self, text=None):
+        """ Changes a message to player
+        """
+        self.top_layer_map = Text_map(text=text)
+        self.full_redraw = True
+        if text:
+            self.top_layer_map.make_frame()
+            self.top_layer_map.add_text()
+            self.top_layer_map.make_chars()
+
+    @staticmethod
+    def new_coor(coor, direction, length=1):
+        """Returns new coordinates based on given by
+        coor and shifted by direction and length
+
+        length: int; tells how far we are checking
+        returns coor; (letter, number)"""
+        assert direction in list(Game.directions.keys())
+        if direction == 'up':
+            return (coor[0]-length, coor[1])
+        elif direction == 'down':
+            return (coor[0]+length, coor[1])
+        elif direction == 'left':
+            return (coor[0], coor[1] - length)
+        elif direction == 'right':
+            return (coor[0], coor[1] + length)
+
+    @staticmethod
+    def coors_dist(coor1, coor2):
+        y_dist = abs(coor1[0] - coor2[0])
+        x_dist = abs(coor1[1] - coor2[1])
+        return y_dist + x_dist
+
+    @staticmethod
+    def objects_dist(object1, object2):
+        y_dist = abs(object1.coor[0] - object2.coor[0])
+        x_dist = abs(object1.coor[1] - object2.coor[1])
+        return y_dist + x_dist
+
+
+class Text_map():
+    """Representation for text labels on screen
+    https://stackoverflow.com/questions/40690248/copy-numpy-array-into-part-of-another-array
+    """
+    def __init__(self, text=None):
+        if text is not None:
+            self.text = text
+            self.shape = (text.count('\n')+5), \
+                         (max([len(line) for line in text.split('\n')])+4)
+            self.grid = np.empty(self.shape, dtype='<U11')
+
+    def make_frame(self):
+        self.grid[0, :] = self.grid[-1, :] = '#'
+        self.grid[:, 0] = self.grid[:, -1] = '#'
+        self.grid[1, 1:self.shape[1]-1] = self.grid[-2, 1:self.shape[1]-1] = ' '
+        self.grid[1:self.shape[0]-1, 1] = self.grid[1:self.shape[0]-1, -2] = ' '
+
+    def add_text(self):
+        text_lines = self.text.split('\n')
+        for i in range(len(text_lines)):
+            text_lines[i] = text_lines[i].center(self.shape[1]-4, ' ')
+            for j in range(len(text_lines[i])):
+                self.grid[i+2, j+2] = text_lines[i][j]
+
+    def make_chars(self):
+        """Turns the grid into block of ascii codes which is pasted into Game frames"""
+        signs = ''.join(sign[:1] or ' ' for sign in self.grid.ravel())
+        self.chars = np.frombuffer(signs.encode('ascii', 'replace'), dtype=np.uint8).reshape(self.shape)
+
+    def clear_all(self):
+        """Clears the Text_map"""
+        self.text = 0
+        self.grid = np.empty(0,0)
+
+
+class Hero:
+    """ Player's hero representation
+
+    coor: coordinates; tuple(y,x)
+    direction: one of  '^'/'v'/'<'/'>'
+    occupancy: Occupancy object of the game; updated with every move
+    """
+
+    def __init__(self, rng=random):
+        """ rng: random module or random.Random object"""
+        self.coor = tuple()
+        self.direction = rng.choice(list(Game.directions.keys()))
+        self.occupancy = None
+
+    def appear(self, game, away_from=None, min_distance=0):
+        """Hero appears on map
+            Cell is picked from the index of free cells (Maze.free_cells), so no cell is given twice
+
+        game: Game object
+        away_from, min_distance: appear at least min_distance (Manhattan) from coordinates away_from
+        Only cells of game.spawn_mask are used if it is set (see Game.analyze_level)"""
+        self.coor = game.map.free_cells().take(game.random, away_from, min_distance, game.spawn_mask)
+        while self.coor is not None and game.occupancy.at(self.coor):
+            self.coor = game.map.free_cells().take(game.random, away_from, min_distance, game.spawn_mask)
+        if self.coor is None:
+            raise ValueError('No free cell left to appear on (min_distance %d)' % min_distance)
+        self.occupancy = game.occupancy
+        self.occupancy.add(self, self.coor)
+
+    def turn(self, turn_direction):
+        if self.direction == turn_direction:
+            return False
+        else:
+            self.direction = turn_direction
+            return True
+
+    def move(self, move_direction):
+        """
+        move_direction can be: up, down, left, right
+        """
+        self.place(Game.new_coor(self.coor, move_direction))
+
+    def place(self, coor):
+        """ Puts hero on coor keeping the occupancy index in sync
+        """
+        if self.occupancy is not None:
+            self.occupancy.move(self, self.coor, coor)
+        self.coor = coor
+
+
+class Troll(Hero):
+    def __init__(self, game):
+        """
+            Troll (enemy) representation
+
+            path: list; list of needed moves to reach the hero (player)
+            plan: list; (coor, direction) states from the troll to the hero, kept between turns by repair_plan
+            extensions: int; steps added to the plan since it was searched from scratch
+            searched_length: int; length of the plan when it was searched from scratch
+            last_repair: (length of the plan, distance to the hero) after the last repair_plan
+            trapped_version: Game.terrain_version when search found no way to the hero
+            expansions: int; number of states expanded by the last search
+            planned_turn: Game.turn of the last exact move (see Troll_scheduler) or None
+        """
+        super().__init__(game.random)
+        self.path = []
+        self.plan = []
+        self.extensions = 0
+        self.searched_length = 0
+        self.last_repair = None
+        self.trapped_version = None
+        self.expansions = 0
+        self.planned_turn = None
+        self.game = game
+
+    def find_path(self, max_expansions=None):
+        """
+            Based on A* search algorithm (Pathfinding.astar), hierarchical one (Game.hpa_graph) with 'hpa' planner
+            Searched states are (coor, direction) so turning costs a move like in the game
+            path element:
+                coor: tuple; coordinates
+                direction: direction of the move that leads to coor (None for the start)
+                parent: coordinates of previous path element
+            Path has only the start element if the troll is trapped
+
+            max_expansions: int or None; limit of A* search (hierarchical one has none)
+            returns False if the search gave up; plan and path are kept as they were then
+        """
+        if self.game.planner == 'hpa':
+            states, self.expansions = self.game.hpa_graph().search(self.coor, self.direction, self.game.hero.coor)
+        else:
+            states, self.expansions = astar(self.game.passable(), self.game.map.shape[1],
+                                            self.coor, self.direction, self.game.hero.coor, max_expansions)
+        if self.game.profiler is not None:
+            self.game.profiler.troll_expansions(self)
+        if states is None:
+            return False
+        self.plan = states
+        self.extensions = 0
+        self.searched_length = len(states)
+        self.last_repair = (len(states), Game.coors_dist(self.coor, self.game.hero.coor))
+        self.path = [{'coor': self.coor, 'direction': None, 'parent': None}]
+        for coor, direction in states[1:]:
+            if coor != self.path[-1]['coor']:
+                self.path.append({'coor': coor, 'direction': direction, 'parent': self.path[-1]['coor']})
+        return True
+
+    def repair_plan(self, new_walls, max_expansions=None, new_paths=()):
+        """ Keeps self.plan leading to the hero; searches from scratch (find_path) only if it can't be repaired
+            hero moved to a cell of the plan - plan is cut there
+            hero moved one cell away - one step (and a turn if needed) is added to the plan
+            a new wall on the plan - detour to the rest of the plan (Pathfinding.rejoin)
+            after many added steps (detours count too; against the length found by the last search,
+            not the grown plan), when the hero got closer but the plan longer, or when a cell opened
+            by a pushed wall may cut the plan short, plan is searched again,
+            so it doesn't get much longer than the best one
+
+        new_walls: set of coordinates which became walls since the last turn
+        max_expansions: int or None; limit of a search from scratch
+        new_paths: coordinates which became paths since the last turn
+        returns False if the search gave up (see find_path)
+        """
+        game = self.game
+        hero = game.hero.coor
+        plan = self.plan
+        state = (self.coor, self.direction)
+        if len(plan) > 1 and plan[1] == state:
+            plan.pop(0)  # last planned step was made
+        if not plan or plan[0] != state:
+            return self.replan(max_expansions)
+        allowed = max(8, self.searched_length // 4)
+        if new_paths:
+            # opened cells may cut the way short; the field from the hero (one for all trolls) tells by how much
+            shortest = game.troll_field([self], max_expansions).distance(self.coor, self.direction)
+            if shortest != -1 and shortest < len(plan) - 1 - allowed:
+                return self.replan(max_expansions)
+        if plan[-1][0] != hero:
+            for i, (coor, direction) in enumerate(plan):
+                if coor == hero:
+                    del plan[i + 1:]
+                    break
+            else:
+                if Game.coors_dist(plan[-1][0], hero) != 1 or self.extensions >= allowed:
+                    return self.replan(max_expansions)
+                last, direction = plan[-1]
+                to_hero = [name for name in Game.directions if Game.new_coor(last, name) == hero][0]
+                if direction != to_hero:
+                    plan.append((last, to_hero))
+                plan.append((hero, to_hero))
+                self.extensions += 1
+                gap = Game.coors_dist(self.coor, hero)
+                if self.last_repair is not None and gap < self.last_repair[1] and len(plan) > self.last_repair[0]:
+                    # hero came closer but the plan goes round, there may be a shorter way now
+                    return self.replan(max_expansions)
+        while new_walls:
+            blocked = next((i for i, (coor, direction) in enumerate(plan) if coor in new_walls), None)
+            if blocked is None:
+                break
+            if blocked == 0:
+                return self.replan(max_expansions)
+            plan, self.expansions = rejoin(game.passable(), game.map.shape[1], plan, blocked, 4 * len(plan) + 64)
+            if game.profiler is not None:
+                game.profiler.troll_expansions(self)
+            if plan is None:
+                return self.replan(max_expansions)
+            self.extensions += max(0, len(plan) - len(self.plan))
+            self.plan = plan
+        self.last_repair = (len(self.plan), Game.coors_dist(self.coor, hero))
+        return True
+
+    def replan(self, max_expansions=None):
+        """ Searches the plan from scratch unless troll was found trapped and walls didn't move since
+            returns False if the search gave up (see find_path)
+        """
+        if self.trapped_version == self.game.terrain_version:
+            return True
+        if not self.find_path(max_expansions):
+            return False
+        self.trapped_version = None if self.plan else self.game.terrain_version
+        return True
+
+    def planned_direction(self):
+        """ Direction of the next step of the plan (turn if the troll isn't facing it), None without plan
+        """
+        if len(self.plan) < 2:
+            return None
+        return self.plan[1][1]
+
+    def stale_direction(self):
+        """ Next step of a plan searched in some earlier turn, None if the troll isn't on it any more
+            or the next cell isn't free now; hero may have moved since, so the plan leads where he was
+        """
+        plan = self.plan
+        state = (self.coor, self.direction)
+        if len(plan) > 1 and plan[1] == state:
+            plan.pop(0)
+        if len(plan) < 2 or plan[0] != state:
+            return None
+        coor, direction = plan[1]
+        if coor != self.coor and coor != self.game.hero.coor and \
+                not self.game.passable()[coor[0] * self.game.map.shape[1] + coor[1]]:
+            return None
+        return direction
+
+    def drift_direction(self):
+        """ Greedy step towards the hero, only the next cell is looked at; None if both ways are walls
+            Facing direction goes first, so the troll doesn't lose moves turning
+        """
+        game = self.game
+        (y, x), (hero_y, hero_x) = self.coor, game.hero.coor
+        options = []
+        if hero_y != y:
+            options.append('up' if hero_y < y else 'down')
+        if hero_x != x:
+            # the longer way first
+            index = 0 if abs(hero_x - x) > abs(hero_y - y) else len(options)
+            options.insert(index, 'left' if hero_x < x else 'right')
+        if self.direction in options:
+            options.remove(self.direction)
+            options.insert(0, self.direction)
+        passable = game.passable()
+        width = game.map.shape[1]
+        for direction in options:
+            coor = Game.new_coor(self.coor, direction)
+            if coor == game.hero.coor or passable[coor[0] * width + coor[1]]:
+                return direction
+        return None
+
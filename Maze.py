@@ -2,7 +2,145 @@
 
 import numpy as np
 import matplotlib.pyplot as pyplot
-from random import randint, randrange
+import random
+
+
+class Wall_bitmap:
+    """ Terrain-only grid packed to one bit per cell: 1-wall, 0-anything else
+    Indexed like np.array with [y, x] where y and x are ints or slices
+
+    bits: np.array of uint8; every row of the grid packed with np.packbits
+    """
+    def __init__(self, shape):
+        self.shape = shape
+        self.bits = np.zeros((shape[0], (shape[1] + 7) // 8), dtype=np.uint8)
+
+    def __getitem__(self, index):
+        y, x = index
+        return np.unpackbits(self.bits[y], axis=-1, count=self.shape[1])[..., x]
+
+    def __setitem__(self, index, value):
+        y, x = index
+        rows = np.unpackbits(self.bits[y], axis=-1, count=self.shape[1])
+        rows[..., x] = np.asarray(value) == 1
+        self.bits[y] = np.packbits(rows, axis=-1)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def copy(self):
+        other = Wall_bitmap(self.shape)
+        other.bits = self.bits.copy()
+        return other
+
+    def unpack(self):
+        """ Returns np.array of uint8; 1 for walls, 0 for the rest"""
+        return np.unpackbits(self.bits, axis=-1, count=self.shape[1])
+
+    @staticmethod
+    def pack(grid):
+        """ Makes Wall_bitmap from an array of grid codes; only 1 is treated as a wall"""
+        bitmap = Wall_bitmap(grid.shape)
+        bitmap.bits = np.packbits(grid == 1, axis=-1)
+        return bitmap
+
+
+class Free_cells:
+    """ Index of path cells (code 0) of a grid, for spawning hero and trolls
+    Cells are flat indexes (y * width + x) kept in one array, the ones not picked yet in front:
+    add, remove and random pick without replacement are O(1)
+    Indexes are int32 (grids up to 2**31 cells), about 4 bytes for every cell and 4 more for every path
+
+    cells: np.array of int32; cells[:available] can still be picked by take
+    position: np.array of int32 for every cell of the grid; its place in cells, -1 if not a path
+    available: int; number of cells not picked yet
+    """
+    def __init__(self, grid):
+        self.width = grid.shape[1]
+        self.cells = np.flatnonzero(grid == 0).astype(np.int32)
+        self.position = np.full(grid.size, -1, dtype=np.int32)
+        self.position[self.cells] = np.arange(len(self.cells), dtype=np.int32)
+        self.length = self.available = len(self.cells)
+
+    def __len__(self):
+        return self.length
+
+    def __contains__(self, coor):
+        return self.position[coor[0] * self.width + coor[1]] != -1
+
+    def copy(self):
+        other = Free_cells.__new__(Free_cells)
+        other.width, other.length, other.available = self.width, self.length, self.available
+        other.cells, other.position = self.cells.copy(), self.position.copy()
+        return other
+
+    def swap(self, i, j):
+        cells, position = self.cells, self.position
+        cells[i], cells[j] = cells[j], cells[i]
+        position[cells[i]], position[cells[j]] = i, j
+
+    def add(self, coor):
+        """ coor became a path; it can be picked at once"""
+        cell = coor[0] * self.width + coor[1]
+        if self.position[cell] != -1:
+            return
+        if self.length == len(self.cells):
+            self.cells = np.concatenate([self.cells, np.empty(max(16, self.length // 4), dtype=np.int32)])
+        self.cells[self.length] = cell
+        self.position[cell] = self.length
+        self.swap(self.length, self.available)
+        self.length += 1
+        self.available += 1
+
+    def remove(self, coor):
+        """ coor isn't a path anymore"""
+        i = self.position[coor[0] * self.width + coor[1]]
+        if i == -1:
+            return
+        if i < self.available:
+            self.available -= 1
+            self.swap(i, self.available)
+            i = self.available
+        self.length -= 1
+        self.swap(i, self.length)
+        self.position[self.cells[self.length]] = -1
+
+    def reset(self):
+        """ All paths can be picked again"""
+        self.available = self.length
+
+    def take(self, rng, away_from=None, min_distance=0, allowed=None):
+        """ Picks a random path cell which wasn't picked yet
+
+        rng: random module or random.Random object
+        away_from, min_distance: picked cell is at least min_distance (Manhattan) from coordinates away_from
+        allowed: flat np.array of bools for every cell of the grid or None; only cells marked True are picked
+        returns coordinates (y, x) or None if no cell is left
+        """
+        for tries in range(16):
+            if not self.available:
+                return None
+            cell = int(self.cells[rng.randrange(self.available)])
+            coor = divmod(cell, self.width)
+            if (away_from is None or abs(coor[0] - away_from[0]) + abs(coor[1] - away_from[1]) >= min_distance) \
+                    and (allowed is None or allowed[cell]):
+                self.available -= 1
+                self.swap(self.position[cell], self.available)
+                return coor
+        # crowded around away_from or few cells allowed; choosing only from the cells that fit
+        cells = self.cells[:self.available]
+        fit = np.ones(len(cells), dtype=bool) if allowed is None else allowed[cells]
+        if away_from is not None:
+            ys, xs = np.divmod(cells, self.width)
+            fit &= np.abs(ys - away_from[0]) + np.abs(xs - away_from[1]) >= min_distance
+        far = np.flatnonzero(fit)
+        if not len(far):
+            return None
+        cell = int(self.cells[far[rng.randrange(len(far))]])
+        self.available -= 1
+        self.swap(self.position[cell], self.available)
+        return divmod(cell, self.width)
 
 
 class Maze:
@@ -10,8 +148,13 @@ class Maze:
     built with array with elements 0-path, 1-wall, 2-exit
 
     standard beginning: maze_obj.fill_borders -> maze_obj.make_aisles
+
+    grid: np.array of uint8 codes (1 byte per cell)
+          or Wall_bitmap if packed (1 bit per cell, terrain only: walls and paths, exit is kept in self.exit)
+    free: Free_cells or None; index of paths, kept up to date by add_obj; built by make_aisles for unpacked mazes,
+          for packed ones and copies only when it is needed (free_cells)
     """
-    def __init__(self, width , height, complexity=0.75, density=0.75):
+    def __init__(self, width , height, complexity=0.75, density=0.75, packed=False):
         # Only odd shapes
         self.shape = ((height // 2) * 2 + 1, (width // 2) * 2 + 1)
         # Adjust complexity and density relative to maze size
@@ -19,17 +162,57 @@ class Maze:
         self.density = int(density * ((self.shape[0] // 2) * (self.shape[1] // 2)))  # size of components
         # Build actual maze
         self.exit = []
-        self.grid = np.zeros(self.shape)
+        self.free = None
+        self.packed = packed
+        if packed:
+            self.grid = Wall_bitmap(self.shape)
+        else:
+            self.grid = np.zeros(self.shape, dtype=np.uint8)
 
     def __str__(self):
-        str_array = np.array(self.grid.flatten())
-        str_array.resize(self.shape)
-        return str(str_array)
+        return str(self.as_array())
 
     def copy(self):
-        other = Maze(self.shape[1], self.shape[0], self.complexity, self.density)
-        other.grid = np.copy(self.grid)
+        other = Maze(0, 0, packed=self.packed)
+        other.shape = self.shape
+        other.complexity = self.complexity
+        other.density = self.density
+        other.grid = self.grid.copy()
         other.exit = self.exit[:]
+        # index of paths is built again by free_cells if the copy needs it
+        return other
+
+    @property
+    def nbytes(self):
+        return self.grid.nbytes
+
+    def free_cells(self):
+        """ Index of paths (Free_cells), built from the grid on first use"""
+        if self.free is None:
+            self.free = Free_cells(self.as_array())
+        return self.free
+
+    def as_array(self):
+        """ Returns grid as np.array of uint8 codes (a new array if the maze is packed)"""
+        if not self.packed:
+            return self.grid
+        grid = self.grid.unpack()
+        if self.exit:
+            grid[self.exit[0], self.exit[1]] = 2
+        return grid
+
+    def pack(self):
+        """ Returns packed (terrain only) copy of the maze"""
+        other = self.copy()
+        other.packed = True
+        other.grid = Wall_bitmap.pack(self.as_array())
+        return other
+
+    def unpack(self):
+        """ Returns copy of the maze with grid of uint8 codes"""
+        other = self.copy()
+        other.packed = False
+        other.grid = self.as_array().copy()
         return other
 
     def fill_borders(self, value=1):
@@ -37,9 +220,30 @@ class Maze:
         self.grid[:, 0] = self.grid[:, -1] = value
         # print(np.argwhere(self.grid == 1))
 
-    def make_aisles(self):
+    def make_aisles(self, generator='classic', seed=None):
+        """ Builds walls inside the borders
+
+        generator: name of the backend from Maze.generators
+            classic - random walks one after another (script from wikipedia), slow beyond a few hundred cells
+            walk - the same kind of random walks made in numpy batches, for very large mazes
+            backtracker - iterative depth first search; perfect maze (one path between any two cells)
+        seed: int or None; the same seed gives the same maze
+        """
+        if self.packed:
+            # bit by bit access would be slow; aisles are made on codes and packed again
+            unpacked = self.unpack()
+            unpacked.make_aisles(generator, seed)
+            self.grid = Wall_bitmap.pack(unpacked.grid)
+            # index of paths would be 8 times bigger than the packed grid; free_cells builds it if needed
+            self.free = None
+            return
+        Maze.generators[generator](self, seed)
+        self.free = Free_cells(self.grid)
+
+    def classic_aisles(self, seed=None):
+        rng = random.Random(seed)
         for i in range(self.density):
-            x, y = randrange(0, self.shape[1]+1, 2), randrange(0, self.shape[0]+1, 2) # pick a random position
+            x, y = rng.randrange(0, self.shape[1]+1, 2), rng.randrange(0, self.shape[0]+1, 2) # pick a random position
             self.grid[y, x] = 1
             for j in range(self.complexity):
                 neighbours = []
@@ -48,29 +252,130 @@ class Maze:
                 if y > 1:             neighbours.append((y - 2, x))
                 if y < self.shape[0] - 2:  neighbours.append((y + 2, x))
                 if len(neighbours) > 0:
-                    y_, x_ = neighbours[randint(0, len(neighbours)-1)]
+                    y_, x_ = neighbours[rng.randint(0, len(neighbours)-1)]
                     if self.grid[y_, x_] == 0:
                         self.grid[y_, x_] = 1
                         self.grid[y_ + (y - y_) // 2, x_ + (x - x_) // 2] = 1
                         x, y = x_, y_
 
-    def set_exit(self):
+    def walk_aisles(self, seed=None, batches=64):
+        """ classic_aisles made with numpy: walkers start in batches and every step moves all of them at once
+            Directions are drawn for the whole batch 32 steps in advance, walker is dropped as soon as
+            all its neighbours are walls (it could not move anymore anyway)
+        """
+        rng = np.random.default_rng(seed)
+        grid = self.grid
+        height, width = self.shape
+        # (dy, dx) of up, down, left, right; a step out of the grid is turned back
+        steps = np.array([(-2, 0), (2, 0), (0, -2), (0, 2)])
+        opposite = np.array([1, 0, 3, 2])
+        batch_size = -(-self.density // batches) if self.density else 0
+        for first in range(0, self.density, max(batch_size, 1)):
+            n = min(batch_size, self.density - first)
+            ys = rng.integers(0, (height + 1) // 2, n) * 2
+            xs = rng.integers(0, (width + 1) // 2, n) * 2
+            grid[ys, xs] = 1
+            alive = np.arange(n)
+            for j in range(self.complexity):
+                if not len(alive):
+                    break
+                if j % 32 == 0:
+                    stream = rng.integers(0, 4, (32, n), dtype=np.uint8)
+                d = stream[j % 32, alive]
+                y, x = ys[alive], xs[alive]
+                new_y, new_x = y + steps[d, 0], x + steps[d, 1]
+                outside = (new_y < 0) | (new_y >= height) | (new_x < 0) | (new_x >= width)
+                d[outside] = opposite[d[outside]]
+                new_y, new_x = y + steps[d, 0], x + steps[d, 1]
+                free = grid[new_y, new_x] == 0
+                grid[new_y[free], new_x[free]] = 1
+                grid[(y[free] + new_y[free]) // 2, (x[free] + new_x[free]) // 2] = 1
+                ys[alive[free]], xs[alive[free]] = new_y[free], new_x[free]
+                # drop walkers surrounded by walls
+                y, x = ys[alive], xs[alive]
+                stuck = np.ones(len(alive), dtype=bool)
+                for dy, dx in steps:
+                    around_y, around_x = y + dy, x + dx
+                    inside = (around_y >= 0) & (around_y < height) & (around_x >= 0) & (around_x < width)
+                    stuck[inside] &= grid[around_y[inside], around_x[inside]] != 0
+                alive = alive[~stuck]
+
+    def backtracker_aisles(self, seed=None):
+        """ Iterative depth first search over cells with odd coordinates,
+            bookkeeping in flat bytearray, carved cells are written to the grid at once
+        """
+        rng = random.Random(seed)
+        rows, columns = (self.shape[0] - 1) // 2, (self.shape[1] - 1) // 2
+        if rows < 1 or columns < 1:
+            return
+        self.grid[1:-1, 1:-1] = 1
+        visited = bytearray(rows * columns)
+        width = self.shape[1]
+        start = rng.randrange(rows * columns)
+        visited[start] = 1
+        stack = [start]
+        # flat indexes of carved cells in the whole grid
+        carved = [(2 * (start // columns) + 1) * width + 2 * (start % columns) + 1]
+        while stack:
+            node = stack[-1]
+            r, c = divmod(node, columns)
+            neighbours = []
+            if r > 0 and not visited[node - columns]: neighbours.append(node - columns)
+            if r < rows - 1 and not visited[node + columns]: neighbours.append(node + columns)
+            if c > 0 and not visited[node - 1]: neighbours.append(node - 1)
+            if c < columns - 1 and not visited[node + 1]: neighbours.append(node + 1)
+            if not neighbours:
+                stack.pop()
+                continue
+            other = neighbours[rng.randrange(len(neighbours))]
+            visited[other] = 1
+            stack.append(other)
+            r_, c_ = divmod(other, columns)
+            # cell of the node and the wall between both nodes
+            carved.append((2 * r_ + 1) * width + 2 * c_ + 1)
+            carved.append((r + r_ + 1) * width + c + c_ + 1)
+        self.grid.ravel()[carved] = 0
+
+    def set_exit(self, seed=None):
+        rng = random.Random(seed)
         x = y = 0
         # side of the entrance; 0-top 1-bottom 2-left 3-right
-        side = randint(0, 3)
+        side = rng.randint(0, 3)
         if side < 2:
-            x = randint(1, self.shape[1]-2)
+            x = rng.randint(1, self.shape[1]-2)
             if side == 1:
                 y = self.shape[0] - 1
         if side > 1:
-            y = randint(1, self.shape[0]-2)
+            y = rng.randint(1, self.shape[0]-2)
             if side == 3:
                 x = self.shape[1] - 1
         self.exit = [y, x]
         self.grid[y, x] = 2
+        if self.free is not None:
+            self.free.remove((y, x))
+
+    def move_exit(self, coor_y, coor_x):
+        """ Puts the exit at (coor_y, coor_x), a cell of the border; the old exit becomes a wall"""
+        if self.exit:
+            self.add_obj(1, *self.exit)
+        self.exit = [coor_y, coor_x]
+        self.grid[coor_y, coor_x] = 2
+        if self.free is not None:
+            self.free.remove((coor_y, coor_x))
 
     def add_obj(self, number_repr, coor_y, coor_x):
+        if self.packed and number_repr not in (0, 1):
+            raise ValueError('Packed maze keeps only walls (1) and paths (0), got %s' % number_repr)
         self.grid[coor_y, coor_x] = number_repr
+        if self.free is not None:
+            if number_repr == 0:
+                self.free.add((coor_y, coor_x))
+            else:
+                self.free.remove((coor_y, coor_x))
+
+    generators = {'classic': classic_aisles,
+                  'walk': walk_aisles,
+                  'backtracker': backtracker_aisles}
 
 
 if __name__ == '__main__':
@@ -0,0 +1,88 @@
+""" Spatial index of entities (hero and trolls) on the map
+    Kept in sync by Hero.move / Hero.place, so the game never has to scan all trolls
+"""
+
+
+class Occupancy:
+    """ cell: entities standing there, for O(1) collision checks,
+        plus buckets of bucket_size x bucket_size cells for "entities within radius" queries
+
+    Attributes:
+        cells: dict; coordinates: list of entities (hero and a troll can meet on one cell)
+        buckets: dict; (y // bucket_size, x // bucket_size): set of entities
+        changed: set of coordinates; cells where somebody came or left since it was cleared
+    """
+    def __init__(self, bucket_size=16):
+        self.bucket_size = bucket_size
+        self.cells = {}
+        self.buckets = {}
+        self.changed = set()
+
+    def __len__(self):
+        return sum(len(entities) for entities in self.cells.values())
+
+    def bucket(self, coor):
+        return coor[0] // self.bucket_size, coor[1] // self.bucket_size
+
+    def add(self, entity, coor):
+        self.cells.setdefault(coor, []).append(entity)
+        self.buckets.setdefault(self.bucket(coor), set()).add(entity)
+        self.changed.add(coor)
+
+    def remove(self, entity, coor):
+        entities = self.cells[coor]
+        entities.remove(entity)
+        if not entities:
+            del self.cells[coor]
+        bucket = self.bucket(coor)
+        self.buckets[bucket].discard(entity)
+        if not self.buckets[bucket]:
+            del self.buckets[bucket]
+        self.changed.add(coor)
+
+    def move(self, entity, old_coor, new_coor):
+        self.remove(entity, old_coor)
+        self.add(entity, new_coor)
+
+    def at(self, coor):
+        """ Returns list of entities standing on coor (empty list if nobody)"""
+        return self.cells.get(coor, [])
+
+    def within(self, coor, radius):
+        """ Returns list of entities not further than radius (in moves, without walls) from coor
+        """
+        y, x = coor
+        y_first, x_first = self.bucket((y - radius, x - radius))
+        y_last, x_last = self.bucket((y + radius, x + radius))
+        found = []
+        if (y_last - y_first + 1) * (x_last - x_first + 1) > len(self.buckets):
+            buckets = self.buckets.values()
+        else:
+            buckets = [self.buckets[key] for key in
+                       ((i, j) for i in range(y_first, y_last + 1) for j in range(x_first, x_last + 1))
+                       if key in self.buckets]
+        for entities in buckets:
+            for entity in entities:
+                if abs(entity.coor[0] - y) + abs(entity.coor[1] - x) <= radius:
+                    found.append(entity)
+        return found
+
+    def in_rect(self, y_start, x_start, y_end, x_end):
+        """ Returns dict; coordinates: entities for cells with y_start <= y < y_end and x_start <= x < x_end
+            only buckets overlapping the rectangle are looked at
+        """
+        y_first, x_first = self.bucket((y_start, x_start))
+        y_last, x_last = self.bucket((y_end - 1, x_end - 1))
+        found = {}
+        if (y_last - y_first + 1) * (x_last - x_first + 1) > len(self.buckets):
+            buckets = self.buckets.values()
+        else:
+            buckets = [self.buckets[key] for key in
+                       ((i, j) for i in range(y_first, y_last + 1) for j in range(x_first, x_last + 1))
+                       if key in self.buckets]
+        for entities in buckets:
+            for entity in entities:
+                y, x = entity.coor
+                if y_start <= y < y_end and x_start <= x < x_end:
+                    found[entity.coor] = self.cells[entity.coor]
+        return found
@@ -0,0 +1,591 @@
+""" Path finding for trolls
+    Grid cells are addressed with flat indexes (y * width + x), so searches run on plain python sequences
+    instead of indexing numpy arrays element by element
+"""
+import heapq
+from array import array
+from collections import deque
+
+import numpy as np
+
+# same order as Game.directions
+DIRECTIONS = ('up', 'down', 'left', 'right')
+# (dy, dx) of a step: direction
+STEPS = {(-1, 0): 'up', (1, 0): 'down', (0, -1): 'left', (0, 1): 'right'}
+
+
+def offsets(width):
+    """ Flat index shifts for DIRECTIONS on a grid of given width"""
+    return (-width, width, -1, 1)
+
+
+def passable_cells(grid):
+    """ Flat bytearray; 1 where trolls can walk (grid value 0)
+        one byte per cell and no objects inside, so garbage collections don't walk through it
+    """
+    return bytearray((grid == 0).ravel().tobytes())
+
+
+def astar(passable, width, start, direction, goal, max_expansions=None):
+    """ A* search over (cell, facing) states, moving ahead and turning cost one move each
+        open list is a heap of (sum_cost, h_cost, state) tuples, best g_cost for every seen state
+        is kept in a dict, so there are no list scans
+
+    passable: flat sequence of bools (see passable_cells); goal cell may be not passable (hero stands there)
+    start, goal: coordinates (y, x)
+    direction: start facing; one of DIRECTIONS
+    max_expansions: int or None; search gives up after so many expansions
+    returns (path, expansions); path is a list of (coor, direction) states from start to goal,
+            empty if goal can't be reached, None if the search gave up
+    """
+    size = len(passable)
+    shifts = offsets(width)
+    goal_cell = goal[0] * width + goal[1]
+    goal_y, goal_x = goal
+
+    def h_cost(cell):
+        y, x = divmod(cell, width)
+        return abs(y - goal_y) + abs(x - goal_x)
+
+    start_state = DIRECTIONS.index(direction) * size + start[0] * width + start[1]
+    g_costs = {start_state: 0}
+    parents = {start_state: None}
+    closed = set()
+    open_list = [(h_cost(start_state % size), h_cost(start_state % size), start_state)]
+    expansions = 0
+    found = None
+    while open_list:
+        _, _, state = heapq.heappop(open_list)
+        if state in closed:
+            continue
+        if expansions == max_expansions:
+            return None, expansions
+        closed.add(state)
+        expansions += 1
+        d, cell = divmod(state, size)
+        if cell == goal_cell:
+            found = state
+            break
+        g_cost = g_costs[state] + 1
+        ahead = cell + shifts[d]
+        if passable[ahead] or ahead == goal_cell:
+            neighbours = [d * size + ahead]
+        else:
+            neighbours = []
+        neighbours.extend(other * size + cell for other in range(4) if other != d)
+        for neighbour in neighbours:
+            if neighbour in closed or g_costs.get(neighbour, g_cost + 1) <= g_cost:
+                continue
+            g_costs[neighbour] = g_cost
+            parents[neighbour] = state
+            h = h_cost(neighbour % size)
+            heapq.heappush(open_list, (g_cost + h, h, neighbour))
+    path = []
+    while found is not None:
+        d, cell = divmod(found, size)
+        path.append((divmod(cell, width), DIRECTIONS[d]))
+        found = parents[found]
+    path.reverse()
+    return path, expansions
+
+
+def rejoin(passable, width, plan, blocked, max_expansions):
+    """ Repairs a plan which got a wall on it, instead of searching the whole way again
+        breadth first search over (cell, facing) states from the state just before the wall
+        to any cell of the plan behind the wall
+
+    plan: list of (coor, direction) states, as returned by astar; plan[blocked] became a wall
+    max_expansions: int; search gives up after that many states
+    returns (repaired plan or None, expansions)
+    """
+    size = len(passable)
+    shifts = offsets(width)
+    # cell: index of its last state in the plan behind the wall; the plan leaves the cell from there
+    # (if the plan turns on a cell, the last state faces the way it goes on)
+    targets = {}
+    for index in range(blocked + 1, len(plan)):
+        coor = plan[index][0]
+        targets[coor[0] * width + coor[1]] = index
+    start_coor, start_direction = plan[blocked - 1]
+    start = DIRECTIONS.index(start_direction) * size + start_coor[0] * width + start_coor[1]
+    parents = {start: None}
+    queue = deque([start])
+    expansions = 0
+    found = None
+    while queue and expansions < max_expansions:
+        state = queue.popleft()
+        expansions += 1
+        d, cell = divmod(state, size)
+        if cell in targets:
+            found = state
+            break
+        ahead = cell + shifts[d]
+        neighbours = [d * size + ahead] if passable[ahead] else []
+        neighbours.extend(other * size + cell for other in range(4) if other != d)
+        for neighbour in neighbours:
+            if neighbour not in parents:
+                parents[neighbour] = state
+                queue.append(neighbour)
+    if found is None:
+        return None, expansions
+    detour = []
+    while found is not None:
+        d, cell = divmod(found, size)
+        detour.append((divmod(cell, width), DIRECTIONS[d]))
+        found = parents[found]
+    detour.reverse()
+    index = targets[detour[-1][0][0] * width + detour[-1][0][1]]
+    if detour[-1][1] != plan[index][1] and index < len(plan) - 1:
+        detour.append(plan[index])  # turn to the way the plan goes on
+    return plan[:blocked - 1] + detour + plan[index + 1:], expansions
+
+
+class Distance_field:
+    """ Reverse search from the target (hero) over (cell, facing) states
+        Every step and every turn costs one move - the same cost model as Troll.find_path -
+        so dist[state] tells how many turns a troll standing in that state needs to reach the target.
+        One field per turn is shared by all trolls, each of them reads its next move in O(1)
+        Buffers are made once: reset gives the field another target clearing only the states reached before,
+        so a new field costs as much as the search, not as the size of the grid
+
+        state index: direction_number * size + cell
+
+    Attributes:
+        width: int; width of the grid
+        size: int; number of cells
+        passable: sequence of bools; cells trolls can walk on (see passable_cells)
+        target: int; flat index of the target
+        dist: array of ints; distance for every state, -1 if not reached
+        queue: array of reached states in the order of the search; queue[head:] are still to be expanded
+        head: int; states expanded so far, build goes on from there
+        expansions: int; number of states taken from the queue since the last reset
+        complete: bool; whole reachable area was searched, so -1 means "can't reach the target"
+    """
+    def __init__(self, grid, target, passable=None):
+        self.width = grid.shape[1]
+        self.size = grid.size
+        self.dist = array('i', [-1]) * (4 * self.size)
+        self.queue = array('i')
+        self.reset(target, passable if passable is not None else passable_cells(grid))
+
+    def reset(self, target, passable=None):
+        """ Starts the field again for target (coordinates); passable is replaced if given
+        """
+        dist = self.dist
+        for state in self.queue:
+            dist[state] = -1
+        if passable is not None:
+            self.passable = passable
+        self.target = target[0] * self.width + target[1]
+        self.queue = array('i', (d * self.size + self.target for d in range(4)))
+        for state in self.queue:
+            dist[state] = 0
+        self.head = 0
+        self.expansions = 0
+        self.complete = False
+
+    def state(self, coor, direction):
+        return DIRECTIONS.index(direction) * self.size + coor[0] * self.width + coor[1]
+
+    def build(self, sources=None, max_expansions=None):
+        """ Breadth first search from the target (all moves cost 1); goes on where the last build stopped
+
+        sources: iterable of (coor, direction); search stops as soon as all of them are reached,
+                 without sources whole reachable part of the grid is covered
+        max_expansions: int or None; search stops after so many expansions, sources not reached by then
+                        have distance -1 like unreachable ones (complete stays False)
+        returns number of states expanded by this call
+        """
+        size = self.size
+        dist = self.dist
+        passable = self.passable
+        shifts = offsets(self.width)
+        queue = self.queue
+        remaining = None
+        if sources is not None:
+            remaining = {state for state in (self.state(coor, direction) for coor, direction in sources)
+                         if dist[state] == -1}
+        head = start = self.head
+        stop = len(dist) if max_expansions is None else head + max_expansions
+        while head < len(queue) and head < stop:
+            if remaining is not None and not remaining:
+                break
+            state = queue[head]
+            head += 1
+            d, cell = divmod(state, size)
+            k = dist[state] + 1
+            # troll standing one step back and facing the same way just moves forward
+            previous = cell - shifts[d]
+            if 0 <= previous < size and passable[previous] and dist[d * size + previous] == -1:
+                dist[d * size + previous] = k
+                queue.append(d * size + previous)
+                if remaining is not None:
+                    remaining.discard(d * size + previous)
+            # troll standing here and facing other way has to turn first
+            if cell != self.target:
+                for other in range(4):
+                    if other != d and dist[other * size + cell] == -1:
+                        dist[other * size + cell] = k
+                        queue.append(other * size + cell)
+                        if remaining is not None:
+                            remaining.discard(other * size + cell)
+        self.head = head
+        self.expansions += head - start
+        self.complete = head == len(queue)
+        return head - start
+
+    def covers(self, sources):
+        """ Tells if the field can be used for all sources without searching again
+            distances found by breadth first search are final, so a stopped search is still good
+            for every state it has already reached
+        """
+        return self.complete or all(self.dist[self.state(coor, direction)] != -1 for coor, direction in sources)
+
+    def distance(self, coor, direction):
+        return self.dist[self.state(coor, direction)]
+
+    def next_direction(self, coor, direction):
+        """ Returns direction of the best move for a troll at coor facing direction
+            same direction means "go ahead", other direction means "turn"
+            None if the target can't be reached
+        """
+        size = self.size
+        d = DIRECTIONS.index(direction)
+        cell = coor[0] * self.width + coor[1]
+        k = self.dist[d * size + cell]
+        if k <= 0:
+            return None
+        ahead = cell + offsets(self.width)[d]
+        if self.dist[d * size + ahead] == k - 1:
+            return direction
+        for other in range(4):
+            if self.dist[other * size + cell] == k - 1:
+                return DIRECTIONS[other]
+        return None
+
+
+def states_along(path, direction):
+    """ Turns a path of neighbouring cells into (coor, direction) states like those of astar
+        a turn state is put before every step which changes the facing
+
+    path: list of coordinates (y, x); path[0] is the start
+    direction: start facing
+    """
+    states = [(path[0], direction)] if path else []
+    for (y, x), coor in zip(path, path[1:]):
+        step = STEPS[coor[0] - y, coor[1] - x]
+        if step != direction:
+            direction = step
+            states.append(((y, x), direction))
+        states.append((coor, direction))
+    return states
+
+
+class Cluster_graph:
+    """ Hierarchical path finding (HPA*) for big mazes
+        Grid is cut into square clusters. Every run of open cells along a border of two clusters gets
+        portals (one in the middle, two at the ends of long runs), which are linked across the border.
+        Search runs over portals only and the result is refined cluster by cluster with small searches,
+        so a long way costs a few thousand steps instead of a search through the whole maze.
+        Costs inside a cluster are counted in cells and turns are added only to the refined path;
+        portal search is weighted A* (h_cost * weight), so paths are longer than the best ones
+        (with weight 2 on a 401x401 walk maze about 12% on average, up to about 45%; weight 1 keeps them
+        within a few percent, but expands so many more portals that searches on 2000x2000 take hundreds of ms).
+        Distances between portals of a cluster are searched for all clusters at once when the graph is built
+        (precompute_edges), so the first search costs about as much as the next ones.
+
+    Attributes:
+        width, height: int; shape of the grid
+        passable: sequence of bools; cells trolls can walk on (see passable_cells)
+        cluster_size: int; side of a cluster in cells
+        weight: float; weight of the heuristic in portal search, 1 gives the best paths on the portal graph
+        columns, rows: int; number of clusters in a row and in a column
+        portals: dict; cluster number: set of portal cells (flat indexes)
+        links: dict; portal cell: set of portal cells of the neighbour clusters, one move away
+        edge_portals: np.array of all portal cells when the graph was built, sorted
+        edge_start: np.array; edges of edge_portals[i] are edge_others[edge_start[i]:edge_start[i + 1]]
+        edge_others, edge_costs: np.array; other portal of the same cluster and distance to it
+        changed: set of clusters changed by update since the graph was built; their edges are in intra
+        intra: dict; cluster number: {portal: {other portal: distance}} for changed clusters; filled for portals
+               the search expands, dropped with update
+        legs: dict; cluster number: {(portal, other portal): list of coordinates}; refined parts of paths,
+              kept like intra
+        expansions: int; number of states expanded by the last search (portals and cluster cells)
+    """
+    def __init__(self, grid, cluster_size=16, passable=None, weight=2):
+        self.height, self.width = grid.shape
+        self.passable = passable if passable is not None else passable_cells(grid)
+        self.cluster_size = cluster_size
+        self.weight = weight
+        self.columns = -(-self.width // cluster_size)
+        self.rows = -(-self.height // cluster_size)
+        self.portals = {}
+        self.links = {}
+        self.intra = {}
+        self.legs = {}
+        self.changed = set()
+        self.expansions = 0
+        for cluster in range(self.rows * self.columns):
+            for border in self.borders(cluster)[1::2]:
+                self.link_border(border)
+        self.precompute_edges()
+
+    def cluster(self, cell):
+        y, x = divmod(cell, self.width)
+        return (y // self.cluster_size) * self.columns + x // self.cluster_size
+
+    def bounds(self, cluster):
+        """ Returns (y_start, x_start, y_end, x_end) of the cluster"""
+        cy, cx = divmod(cluster, self.columns)
+        size = self.cluster_size
+        return cy * size, cx * size, min((cy + 1) * size, self.height), min((cx + 1) * size, self.width)
+
+    def borders(self, cluster):
+        """ Returns borders of the cluster with its neighbours in order up, down, left, right
+            border is a list of (cell, cell of the neighbour) pairs, empty at the edge of the grid
+        """
+        y_start, x_start, y_end, x_end = self.bounds(cluster)
+        width = self.width
+        up = [(y_start * width + x, (y_start - 1) * width + x) for x in range(x_start, x_end)] if y_start else []
+        down = [((y_end - 1) * width + x, y_end * width + x) for x in range(x_start, x_end)] \
+            if y_end < self.height else []
+        left = [(y * width + x_start, y * width + x_start - 1) for y in range(y_start, y_end)] if x_start else []
+        right = [(y * width + x_end - 1, y * width + x_end) for y in range(y_start, y_end)] \
+            if x_end < self.width else []
+        return up, down, left, right
+
+    def link_border(self, border):
+        """ Puts portals on every run of open cell pairs along the border"""
+        passable = self.passable
+        run = []
+        for pair in border + [(None, None)]:
+            if pair[0] is not None and passable[pair[0]] and passable[pair[1]]:
+                run.append(pair)
+                continue
+            if run:
+                chosen = [run[len(run) // 2]] if len(run) < 6 else [run[0], run[-1]]
+                for cell, other in chosen:
+                    self.portals.setdefault(self.cluster(cell), set()).add(cell)
+                    self.portals.setdefault(self.cluster(other), set()).add(other)
+                    self.links.setdefault(cell, set()).add(other)
+                    self.links.setdefault(other, set()).add(cell)
+                run = []
+
+    def unlink_border(self, border):
+        for cell, other in border:
+            for a, b in ((cell, other), (other, cell)):
+                if b in self.links.get(a, ()):
+                    self.links[a].discard(b)
+                    if not self.links[a]:
+                        del self.links[a]
+                        self.portals[self.cluster(a)].discard(a)
+
+    def update(self, coors, passable):
+        """ Builds again portals of clusters with changed cells (after Game.push_wall)
+
+        coors: changed coordinates
+        passable: new list of passable cells
+        """
+        self.passable = passable
+        for cluster in {self.cluster(y * self.width + x) for y, x in coors}:
+            for border in self.borders(cluster):
+                self.unlink_border(border)
+                self.link_border(border)
+            cy, cx = divmod(cluster, self.columns)
+            neighbours = [cluster, cluster - self.columns, cluster + self.columns]
+            if cx > 0:
+                neighbours.append(cluster - 1)
+            if cx < self.columns - 1:
+                neighbours.append(cluster + 1)
+            for neighbour in neighbours:
+                self.changed.add(neighbour)
+                self.intra.pop(neighbour, None)
+                self.legs.pop(neighbour, None)
+
+    def precompute_edges(self):
+        """ Fills edge_* arrays with distances between portals of every cluster
+            Breadth first search in numpy from the k-th portal of every cluster at once; a move is open
+            if the next cell is passable and in the same cluster, so every search stays in its cluster
+        """
+        width, size = self.width, self.width * self.height
+        if isinstance(self.passable, (bytes, bytearray)):
+            passable = np.frombuffer(self.passable, dtype=np.uint8).astype(bool)
+        else:
+            passable = np.asarray(self.passable, dtype=bool)
+        # cluster number of open cells, -1 elsewhere; one closed column and closed rows around,
+        # so no move leaves the grid or wraps to another row
+        padded_width = width + 1
+        code = np.full((self.height + 2, padded_width), -1, dtype=np.int32)
+        inner = code[1:-1, :-1]
+        inner[:] = ((np.arange(self.height, dtype=np.int32) // self.cluster_size)[:, None] * self.columns
+                    + np.arange(width, dtype=np.int32) // self.cluster_size)
+        inner[~passable.reshape(self.height, width)] = -1
+        code = code.ravel()
+        shifts = (-padded_width, padded_width, -1, 1)
+        clusters = sorted(cluster for cluster, portals in self.portals.items() if portals)
+        cells = np.array([portal for cluster in clusters for portal in sorted(self.portals[cluster])], dtype=np.int32)
+        padded_cells = cells + cells // width + padded_width
+        owners = code[padded_cells]
+        # portals of a cluster are next to each other in cells: first of them and their number
+        first = np.searchsorted(owners, owners)
+        count = np.searchsorted(owners, owners, side='right') - first
+        slots = np.arange(len(cells)) - first
+        dist = np.empty(code.size, dtype=np.int16)
+        # scratch for removing repeated cells of the frontier without sorting (like Analysis.distance_field)
+        owner = np.empty(code.size, dtype=np.int32)
+        found = []
+        for k in range(int(count.max()) if len(cells) else 0):
+            dist.fill(-1)
+            frontier = padded_cells[slots == k]
+            dist[frontier] = 0
+            step = 0
+            while len(frontier):
+                step += 1
+                frontier_code = code[frontier]
+                reached = []
+                for shift in shifts:
+                    around = frontier + shift
+                    around = around[code[around] == frontier_code]
+                    reached.append(around[dist[around] == -1])
+                around = np.concatenate(reached)
+                places = np.arange(len(around), dtype=np.int32)
+                owner[around] = places
+                frontier = around[owner[around] == places]
+                dist[frontier] = step
+            has_source = count > k
+            costs = dist[padded_cells[has_source]]
+            kept = costs > 0
+            found.append((cells[first[has_source] + k][kept], cells[has_source][kept], costs[kept]))
+        del code, dist, owner
+        sources, others, costs = (np.concatenate([part[i] for part in found]) if found
+                                  else np.empty(0, dtype=np.int32) for i in range(3))
+        order = np.lexsort((others, sources))
+        self.edge_portals = np.sort(cells)
+        self.edge_start = np.searchsorted(sources[order], np.append(self.edge_portals, size))
+        self.edge_others = others[order]
+        self.edge_costs = costs[order]
+
+    def local_search(self, start, cluster):
+        """ Breadth first search from start cell over cells of the cluster
+            returns (distances, parents); dicts keyed by reached cells
+        """
+        y_start, x_start, y_end, x_end = self.bounds(cluster)
+        width = self.width
+        passable = self.passable
+        dist = {start: 0}
+        parents = {start: None}
+        queue = deque([start])
+        while queue:
+            cell = queue.popleft()
+            y, x = divmod(cell, width)
+            k = dist[cell] + 1
+            for other, inside in ((cell - width, y > y_start), (cell + width, y < y_end - 1),
+                                  (cell - 1, x > x_start), (cell + 1, x < x_end - 1)):
+                if inside and other not in dist and passable[other]:
+                    dist[other] = k
+                    parents[other] = cell
+                    queue.append(other)
+        self.expansions += len(dist)
+        return dist, parents
+
+    def portal_edges(self, portal):
+        """ Distances from the portal to the other portals of its cluster: dict other portal: distance
+            from edge_* arrays, or for clusters changed by update searched once and kept in self.intra
+        """
+        cluster = self.cluster(portal)
+        if cluster not in self.changed:
+            i = int(np.searchsorted(self.edge_portals, portal))
+            start, end = self.edge_start[i], self.edge_start[i + 1]
+            return dict(zip(self.edge_others[start:end].tolist(), self.edge_costs[start:end].tolist()))
+        edges = self.intra.setdefault(cluster, {})
+        distances = edges.get(portal)
+        if distances is None:
+            dist = self.local_search(portal, cluster)[0]
+            distances = {other: dist[other] for other in self.portals.get(cluster, ())
+                         if other in dist and other != portal}
+            edges[portal] = distances
+        return distances
+
+    def search(self, start, direction, goal):
+        """ Same interface as astar: returns (path of (coor, direction) states, expansions)
+            path is empty if goal can't be reached
+        """
+        self.expansions = 0
+        width = self.width
+        start_cell, goal_cell = start[0] * width + start[1], goal[0] * width + goal[1]
+        start_cluster, goal_cluster = self.cluster(start_cell), self.cluster(goal_cell)
+        from_start, start_parents = self.local_search(start_cell, start_cluster)
+        if goal_cell in from_start:
+            return states_along(self.tree_path(start_parents, goal_cell)[::-1], direction), self.expansions
+        to_goal, goal_parents = self.local_search(goal_cell, goal_cluster)
+        portals = self.portals.get(start_cluster, set())
+        goal_y, goal_x = goal
+        weight = self.weight
+
+        def h_cost(cell):
+            y, x = divmod(cell, width)
+            return abs(y - goal_y) + abs(x - goal_x)
+
+        g_costs = {start_cell: 0}
+        parents = {start_cell: None}
+        closed = set()
+        open_list = [(h_cost(start_cell), start_cell)]
+        found = False
+        while open_list:
+            _, node = heapq.heappop(open_list)
+            if node in closed:
+                continue
+            closed.add(node)
+            self.expansions += 1
+            if node == goal_cell:
+                found = True
+                break
+            if node == start_cell:
+                neighbours = [(portal, from_start[portal]) for portal in portals if portal in from_start]
+            else:
+                neighbours = list(self.portal_edges(node).items())
+            neighbours.extend((other, 1) for other in self.links.get(node, ()))
+            if node in to_goal:
+                neighbours.append((goal_cell, to_goal[node]))
+            for neighbour, cost in neighbours:
+                g_cost = g_costs[node] + cost
+                if neighbour in closed or g_costs.get(neighbour, g_cost + 1) <= g_cost:
+                    continue
+                g_costs[neighbour] = g_cost
+                parents[neighbour] = node
+                heapq.heappush(open_list, (g_cost + weight * h_cost(neighbour), neighbour))
+        if not found:
+            return [], self.expansions
+        nodes = [goal_cell]
+        while parents[nodes[-1]] is not None:
+            nodes.append(parents[nodes[-1]])
+        nodes.reverse()
+        # refinement; linked portals are neighbours, other pairs lie in one cluster
+        path = [start]
+        for node, other in zip(nodes, nodes[1:]):
+            if other in self.links.get(node, ()):
+                path.append(divmod(other, width))
+            elif node == start_cell:
+                path.extend(self.tree_path(start_parents, other)[-2::-1])
+            elif other == goal_cell:
+                path.extend(self.tree_path(goal_parents, node)[1:])
+            else:
+                path.extend(self.leg(node, other)[1:])
+        return states_along(path, direction), self.expansions
+
+    def tree_path(self, parents, cell):
+        """ Coordinates from cell back to the root of a local_search"""
+        path = [cell]
+        while parents[path[-1]] is not None:
+            path.append(parents[path[-1]])
+        return [divmod(cell, self.width) for cell in path]
+
+    def leg(self, portal, other):
+        """ Shortest list of coordinates between two portals of one cluster, searched once and kept in self.legs"""
+        cluster = self.cluster(portal)
+        legs = self.legs.setdefault(cluster, {})
+        path = legs.get((portal, other))
+        if path is None:
+            path = self.tree_path(self.local_search(other, cluster)[1], portal)
+            legs[portal, other] = path
+        return path
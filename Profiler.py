@@ -0,0 +1,93 @@
+""" Per turn instrumentation of the Game
+    Switched on with game.profiler = Turn_profiler(...) and off with game.profiler = None at any time;
+    when it is None the game only checks that in a few places
+"""
+import gc
+import json
+import sys
+import time
+
+
+def gc_collections():
+    return sum(stat['collections'] for stat in gc.get_stats())
+
+
+class Turn_profiler:
+    """ Collects timings of turn phases, search expansions and allocations for every turn
+
+    Attributes:
+        record: dict; turn being measured
+            turn, trolls: int; turn number and number of trolls
+            phases: dict; phase name: seconds (hero_action, trolls_action, refresh_entities, render, queue, view)
+            field_expansions: int; states expanded by the shared Distance_field (0 if it was reused)
+            troll_expansions: list of [y, x, expansions] for trolls which ran their own search
+            planned_trolls, waiting_trolls: int; searches made and far trolls the far field hasn't reached yet
+                                            (Troll_scheduler, only when the game has one)
+            allocated_blocks: int; change of python allocated memory blocks during the turn
+            gc_collections: int; garbage collections during the turn
+        last: dict; last finished record
+        trace: file or None; every finished record is written there as a JSON line
+    """
+    def __init__(self, trace_path=None):
+        self.trace = open(trace_path, 'a') if trace_path else None
+        self.record = None
+        self.last = None
+        self.mark = time.perf_counter()
+        self.blocks = 0
+        self.collections = 0
+
+    def begin_turn(self, turn, trolls):
+        self.end_turn()
+        self.record = {'turn': turn, 'trolls': trolls, 'phases': {},
+                       'field_expansions': 0, 'troll_expansions': []}
+        self.blocks = sys.getallocatedblocks()
+        self.collections = gc_collections()
+        self.mark = time.perf_counter()
+
+    def lap(self, phase):
+        """ Adds time from the previous lap (or the beginning of the turn) to the phase
+        """
+        now = time.perf_counter()
+        if self.record is not None:
+            phases = self.record['phases']
+            phases[phase] = phases.get(phase, 0.0) + now - self.mark
+        self.mark = now
+
+    def count(self, name, number):
+        if self.record is not None:
+            self.record[name] = self.record.get(name, 0) + number
+
+    def troll_expansions(self, troll):
+        if self.record is not None:
+            self.record['troll_expansions'].append([troll.coor[0], troll.coor[1], troll.expansions])
+
+    def end_turn(self):
+        if self.record is None:
+            return
+        self.record['allocated_blocks'] = sys.getallocatedblocks() - self.blocks
+        self.record['gc_collections'] = gc_collections() - self.collections
+        if self.trace is not None:
+            self.trace.write(json.dumps(self.record) + '\n')
+        self.last = self.record
+        self.record = None
+
+    def close(self):
+        self.end_turn()
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+    def stats_text(self):
+        """ Few lines about the last finished turn for the on screen overlay
+        """
+        if self.last is None:
+            return 'no turns measured yet'
+        lines = ['turn %d, trolls %d' % (self.last['turn'], self.last['trolls'])]
+        for phase, seconds in self.last['phases'].items():
+            lines.append('%s %.2f ms' % (phase, 1000 * seconds))
+        expansions = self.last['field_expansions'] + sum(n for y, x, n in self.last['troll_expansions'])
+        lines.append('expansions %d' % expansions)
+        if 'planned_trolls' in self.last:
+            lines.append('planned %d, waiting %d' % (self.last['planned_trolls'], self.last['waiting_trolls']))
+        lines.append('blocks %+d, gc %d' % (self.last['allocated_blocks'], self.last['gc_collections']))
+        return '\n'.join(lines)
@@ -0,0 +1,97 @@
+""" Replay logs: game settings with seed and hero actions; playing them again gives exactly the same game
+    Log file is text: first line JSON with settings (Game arguments) and checksum of the final state,
+    second line the actions, one sign per turn: u d l r for moves, . for waiting
+
+    usage: python Replay.py LOG [--repeat N] [--snapshot FILE]
+    plays the log headless at full speed, checks the final state and prints turns per second
+"""
+import argparse
+import hashlib
+import json
+import time
+
+from Game import Game
+from Snapshot import save_snapshot
+
+
+def state_checksum(game):
+    """ sha1 of Game.state and the map; equal for equal games"""
+    digest = hashlib.sha1(json.dumps(game.state(), sort_keys=True).encode('ascii'))
+    digest.update(game.map.grid.tobytes())
+    return digest.hexdigest()
+
+
+class Replay_log:
+    """ Seed, settings and hero actions of one game
+
+    Attributes:
+        settings: dict of Game arguments; seed must be among them for the game to be the same
+        actions: list of hero actions (Game.directions keys or None), one for every turn
+        checksum: str or None; state_checksum of the game after the last action
+    """
+    signs = {'up': 'u', 'down': 'd', 'left': 'l', 'right': 'r', None: '.'}
+    actions_of_signs = {sign: action for action, sign in signs.items()}
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self.actions = []
+        self.checksum = None
+
+    def new_game(self):
+        return Game(**self.settings)
+
+    def step(self, game, action=None):
+        """ Plays one turn of game and records it"""
+        self.actions.append(action)
+        return game.step(action)
+
+    def finish(self, game):
+        self.checksum = state_checksum(game)
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            file.write(json.dumps({'settings': self.settings, 'checksum': self.checksum}) + '\n')
+            file.write(''.join(Replay_log.signs[action] for action in self.actions) + '\n')
+
+    @staticmethod
+    def load(path):
+        with open(path) as file:
+            header = json.loads(file.readline())
+            signs = file.readline().strip()
+        log = Replay_log(**header['settings'])
+        log.actions = [Replay_log.actions_of_signs[sign] for sign in signs]
+        log.checksum = header['checksum']
+        return log
+
+    def play(self):
+        """ Plays all actions on a new game; returns the game"""
+        game = self.new_game()
+        game.start()
+        step = game.step
+        for action in self.actions:
+            step(action)
+        return game
+
+    def verify(self, game):
+        """ Tells if game ended in the recorded state; True if nothing was recorded"""
+        return self.checksum is None or state_checksum(game) == self.checksum
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('log')
+    parser.add_argument('--repeat', type=int, default=1, help='play the log N times (for timing)')
+    parser.add_argument('--snapshot', help='save the final game to this snapshot file')
+    args = parser.parse_args()
+
+    log = Replay_log.load(args.log)
+    start = time.perf_counter()
+    for i in range(args.repeat):
+        game = log.play()
+    seconds = time.perf_counter() - start
+    print(json.dumps({'turns': len(log.actions), 'status': game.status, 'same': log.verify(game),
+                      'seconds': seconds, 'turns_per_second': args.repeat * len(log.actions) / seconds}))
+    if args.snapshot:
+        save_snapshot(game, args.snapshot)
+    if not log.verify(game):
+        raise SystemExit(1)
@@ -0,0 +1,199 @@
+""" Level of detail for troll AI
+    Trolls near the hero move exactly every turn; far ones read their moves from one shared field
+    searched from where the hero was some turns ago, or just step towards the hero till the field reaches them.
+    Searches of one turn may be limited by time; the far field is searched a part at a time and goes on
+    in the next turn where it stopped. Far trolls are moved a slice at a time going round the troll list,
+    as many as the time allows, so a turn takes about the same time however many trolls there are.
+"""
+import time
+
+from Pathfinding import Distance_field
+
+
+class Troll_scheduler:
+    """ Decides which trolls get exact moves in this turn; used by Game.trolls_action
+
+    Attributes:
+        game: Game object
+        near_radius: int or None; trolls this close to the hero (in moves, without walls) move exactly
+                     every turn, None - all of them
+        far_every: int; far field is started again from the hero at most once in so many turns (far_field_for)
+        budget_ms: float or None; time for searches in one turn, None - no limit
+                   (with a limit turns depend on the speed of the machine, so replays may differ)
+        far_field: Distance_field or None; shared by far trolls, built a part at a time over turns
+                   (with near_radius None the trolls left over read game.field instead)
+        far_turn: int; Game.turn when far_field was started
+        far_cursor: int; index in game.trolls where the next slice of far trolls starts
+        stats: dict of the last turn: near, planned (searches made), far (far trolls moved),
+               waiting (far trolls not reached yet)
+    """
+    # rough speed of A* search, turns the time left into a limit of expansions
+    expansions_per_ms = 200
+    # states expanded by one part of a field search; time is checked between the parts
+    field_chunk = 2000
+    # far trolls moved together; the first slice of a turn is moved even if the time is out
+    far_slice = 64
+    # part of budget_ms the far field search leaves for moving far trolls
+    far_moves_share = 0.5
+
+    def __init__(self, game, near_radius=None, far_every=8, budget_ms=None):
+        self.game = game
+        self.near_radius = near_radius
+        self.far_every = far_every
+        self.budget_ms = budget_ms
+        self.far_field = None
+        self.far_turn = 0
+        self.far_cursor = 0
+        self.stats = {'near': 0, 'planned': 0, 'far': 0, 'waiting': 0}
+
+    def near_trolls(self):
+        game = self.game
+        if self.near_radius is None:
+            return list(game.trolls)
+        hero = game.hero.coor
+        trolls = [entity for entity in game.occupancy.within(hero, self.near_radius) if entity is not game.hero]
+        trolls.sort(key=lambda troll: abs(troll.coor[0] - hero[0]) + abs(troll.coor[1] - hero[1]))
+        return trolls
+
+    def directions(self, new_walls, new_paths=()):
+        """ Returns list of (troll, direction) of trolls moving in this turn, direction None means waiting
+            near trolls come first, then the far ones of this turn's slices (see far_moves)
+
+        new_walls: set of coordinates which became walls since the last turn
+        new_paths: set of coordinates which became paths since the last turn
+        """
+        game = self.game
+        start = time.perf_counter()
+
+        def time_left():
+            """ milliseconds left for searches, None without limit"""
+            if self.budget_ms is None:
+                return None
+            return self.budget_ms - 1000 * (time.perf_counter() - start)
+
+        def out_of_time():
+            left = time_left()
+            return left is not None and left <= 0
+
+        def out_of_field_time():
+            left = time_left()
+            return left is not None and left <= self.budget_ms * Troll_scheduler.far_moves_share
+
+        def limit():
+            left = time_left()
+            return None if left is None else max(1, int(left * Troll_scheduler.expansions_per_ms))
+
+        chunk = None if self.budget_ms is None else Troll_scheduler.field_chunk
+        near = self.near_trolls()
+        exact = {}
+        planned = 0
+        if game.planner == 'field' and near:
+            # resetting the field for a new hero position is part of the work, so it is timed too
+            field = game.troll_field(near, chunk)
+            while chunk is not None and not out_of_time():
+                head = field.head
+                field = game.troll_field(near, chunk)
+                if field.head - head < chunk:
+                    break  # all near trolls reached or nothing more to search
+            planned += 1
+            for troll in near:
+                # not reached - trapped or further than the search got in time
+                if field.distance(troll.coor, troll.direction) != -1:
+                    exact[id(troll)] = field.next_direction(troll.coor, troll.direction)
+        elif game.planner != 'field':
+            for troll in near:
+                if out_of_time():
+                    break
+                if troll.planned_turn == game.turn - 1:
+                    done = troll.repair_plan(new_walls, limit(), new_paths)
+                else:
+                    # plan was followed without repairs, walls may have moved since it was searched
+                    done = troll.replan(limit())
+                planned += 1
+                if done:
+                    exact[id(troll)] = troll.planned_direction()
+                    troll.planned_turn = game.turn
+        moves = [(troll, exact[id(troll)]) for troll in near if id(troll) in exact]
+        far_moves, waiting = self.far_moves(exact, chunk, out_of_time, out_of_field_time)
+        moves.extend(far_moves)
+        self.stats = {'near': len(near), 'planned': planned, 'far': len(far_moves), 'waiting': waiting}
+        if game.profiler is not None:
+            game.profiler.count('planned_trolls', planned)
+            game.profiler.count('waiting_trolls', waiting)
+        return moves
+
+    def far_moves(self, exact, chunk, out_of_time, out_of_field_time):
+        """ Moves of far trolls (those without an exact move) in this turn, a slice of far_slice trolls at a time
+            Slices go round game.trolls from far_cursor, the next turn starts where this one stopped;
+            after the first slice more are taken only while time is left, the other trolls wait;
+            the far field is searched only till out_of_field_time, the rest of the time is for the moves
+            returns (list of (troll, direction), number of moved trolls the far field hasn't reached)
+        """
+        trolls = self.game.trolls
+        moves = []
+        waiting = 0
+        seen = 0
+        while seen < len(trolls) and (not seen or not out_of_time()):
+            part = []
+            while seen < len(trolls) and len(part) < Troll_scheduler.far_slice:
+                if self.far_cursor >= len(trolls):
+                    self.far_cursor = 0
+                troll = trolls[self.far_cursor]
+                self.far_cursor += 1
+                seen += 1
+                if id(troll) not in exact:
+                    part.append(troll)
+            if not part:
+                break
+            field = self.far_field_for(part, chunk, out_of_field_time)
+            for troll in part:
+                direction = self.far_direction(field, troll)
+                if direction is None:
+                    waiting += 1
+                    direction = troll.stale_direction()
+                moves.append((troll, direction if direction is not None else troll.drift_direction()))
+        return moves, waiting
+
+    def far_field_for(self, far, chunk, out_of_time):
+        """ Far field after this turn's part of the search for the far trolls
+            It is started again from the hero after far_every turns if it has reached all far trolls (or all
+            it can), or if the hero went further than near_radius from where it was searched from
+            With near_radius None all trolls are near, so the ones left over read game.field,
+            which is searched on from the hero
+        """
+        game = self.game
+        sources = [(troll.coor, troll.direction) for troll in far]
+        field = self.far_field
+        if self.near_radius is None:
+            field = game.troll_field([])
+        elif field is None:
+            field = self.far_field = Distance_field(game.map.grid, game.hero.coor, game.passable())
+            self.far_turn = game.turn
+        elif game.turn - self.far_turn >= self.far_every:
+            target = divmod(field.target, field.width)
+            hero = game.hero.coor
+            if abs(hero[0] - target[0]) + abs(hero[1] - target[1]) > (self.near_radius or 0) \
+                    or field.complete or field.covers(sources):
+                field.reset(hero, game.passable())
+                self.far_turn = game.turn
+        while not out_of_time():
+            expansions = field.build(sources, chunk)
+            if game.profiler is not None:
+                game.profiler.count('field_expansions', expansions)
+            if chunk is None or expansions < chunk:
+                break  # all far trolls reached or nothing more to search
+        return field
+
+    def far_direction(self, field, troll):
+        """ Move of a far troll from the far field; None if the field hasn't reached it
+            or a wall was pushed on its way since the field was searched
+        """
+        if field.distance(troll.coor, troll.direction) <= 0:
+            return None
+        direction = field.next_direction(troll.coor, troll.direction)
+        if direction == troll.direction:
+            game = self.game
+            y, x = game.new_coor(troll.coor, direction)
+            if (y, x) != game.hero.coor and not game.passable()[y * game.map.shape[1] + x]:
+                return None
+        return direction
@@ -0,0 +1,178 @@
+""" Batch simulation of headless games
+    Thousands of seeded games are played by a scripted hero in a process pool,
+    workers send back only small result dicts and aggregated stats are reported as games finish
+
+    usage: python Simulation.py --games 1000 --trolls 15 --policy exit
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import time
+from Game import Game
+from Pathfinding import Distance_field
+
+
+class Exit_policy:
+    """ Hero goes the shortest way to the exit, turning costs a move like for trolls
+        random move (may push a wall) if the exit can't be reached
+    """
+    def __init__(self, game):
+        self.game = game
+        self.random = random.Random(game.seed)
+        self.field = None
+        self.terrain_version = -1
+
+    def __call__(self):
+        game = self.game
+        if self.terrain_version != game.terrain_version:
+            self.field = Distance_field(game.map.grid, tuple(game.map.exit), game.passable())
+            self.field.build()
+            self.terrain_version = game.terrain_version
+        direction = self.field.next_direction(game.hero.coor, game.hero.direction)
+        if direction is None:
+            direction = self.random.choice(list(Game.directions))
+        return direction
+
+
+class Random_policy:
+    """ Hero moves in random directions"""
+    def __init__(self, game):
+        self.random = random.Random(game.seed)
+
+    def __call__(self):
+        return self.random.choice(list(Game.directions))
+
+
+policies = {'exit': Exit_policy, 'random': Random_policy}
+
+
+def play_game(task):
+    """ Plays one game to the end or to max_turns; runs in a worker process
+
+    task: (seed, settings dict)
+    returns small dict: seed, status, turns, pathfinding time (seconds spent in Game.trolls_action),
+            difficulty of the level (Game.difficulty, None unless analyze)
+    """
+    seed, settings = task
+    game = Game(settings['width'], settings['height'], settings['trolls'], settings['complexity'],
+                settings['density'], settings['generator'], seed, settings.get('planner', 'field'),
+                near_radius=settings.get('near_radius'), far_every=settings.get('far_every', 8),
+                ai_budget_ms=settings.get('ai_budget_ms'), analyze=settings.get('analyze', False))
+    policy = policies[settings['policy']](game)
+    difficulty = game.difficulty()
+    trolls_action = game.trolls_action
+    path_time = [0.0]
+
+    def timed_trolls_action():
+        start = time.perf_counter()
+        trolls_action()
+        path_time[0] += time.perf_counter() - start
+
+    game.trolls_action = timed_trolls_action
+    game.start()
+    while game.status == 1 and game.turn < settings['max_turns']:
+        game.step(policy())
+    return {'seed': seed, 'status': game.status, 'turns': game.turn, 'path_time': path_time[0],
+            'difficulty': difficulty}
+
+
+class Batch_stats:
+    """ Aggregated results of finished games"""
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.losses = 0
+        self.win_turns = 0
+        self.loss_turns = 0
+        self.turns = 0
+        self.path_time = 0.0
+        # difficulty sums of analysed levels (status: [sum, games])
+        self.difficulty = {2: [0.0, 0], 3: [0.0, 0]}
+
+    def add(self, result):
+        self.games += 1
+        self.turns += result['turns']
+        self.path_time += result['path_time']
+        if result['status'] == 2:
+            self.wins += 1
+            self.win_turns += result['turns']
+        elif result['status'] == 3:
+            self.losses += 1
+            self.loss_turns += result['turns']
+        # unreachable exits give inf, they would hide the rest
+        if result.get('difficulty') is not None and result['status'] in self.difficulty \
+                and result['difficulty'] != float('inf'):
+            self.difficulty[result['status']][0] += result['difficulty']
+            self.difficulty[result['status']][1] += 1
+
+    def summary(self):
+        return {'games': self.games,
+                'wins': self.wins,
+                'losses': self.losses,
+                'unfinished': self.games - self.wins - self.losses,
+                'win_rate': self.wins / self.games if self.games else 0.0,
+                'turns_to_win': self.win_turns / self.wins if self.wins else None,
+                'turns_to_loss': self.loss_turns / self.losses if self.losses else None,
+                'path_ms_per_turn': 1000 * self.path_time / self.turns if self.turns else None,
+                'difficulty_of_wins': self.mean_difficulty(2),
+                'difficulty_of_losses': self.mean_difficulty(3)}
+
+    def mean_difficulty(self, status):
+        total, games = self.difficulty[status]
+        return total / games if games else None
+
+
+def run_batch(games, processes=None, seed=0, **settings):
+    """ Plays games with seeds seed .. seed + games - 1 in a process pool
+
+    settings: width, height, trolls, complexity, density, generator, planner, near_radius, far_every, ai_budget_ms,
+              analyze, policy, max_turns
+    yields (result of a game, Batch_stats) as soon as every game finishes
+    """
+    processes = processes or multiprocessing.cpu_count()
+    tasks = ((seed + i, settings) for i in range(games))
+    chunksize = max(1, games // (processes * 16))
+    stats = Batch_stats()
+    with multiprocessing.Pool(processes) as pool:
+        for result in pool.imap_unordered(play_game, tasks, chunksize):
+            stats.add(result)
+            yield result, stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--width', type=int, default=60)
+    parser.add_argument('--height', type=int, default=25)
+    parser.add_argument('--trolls', type=int, default=15)
+    parser.add_argument('--complexity', type=float, default=0.75)
+    parser.add_argument('--density', type=float, default=0.75)
+    parser.add_argument('--generator', default='classic')
+    parser.add_argument('--planner', choices=['field', 'repair', 'hpa'], default='field')
+    parser.add_argument('--near-radius', type=int, default=None,
+                        help='only trolls this close to the hero move exactly every turn (see Scheduler.py)')
+    parser.add_argument('--far-every', type=int, default=8, help='far trolls search a new plan every N turns')
+    parser.add_argument('--ai-budget', type=float, default=None, help='milliseconds for troll searches per turn')
+    parser.add_argument('--analyze', action='store_true',
+                        help='check levels before playing and report their difficulty (see Analysis.py)')
+    parser.add_argument('--policy', choices=sorted(policies), default='exit')
+    parser.add_argument('--max-turns', type=int, default=1000)
+    parser.add_argument('--report-every', type=int, default=100, help='print aggregated stats every N games')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = Batch_stats()
+    for result, stats in run_batch(args.games, args.processes, args.seed,
+                                   width=args.width, height=args.height, trolls=args.trolls,
+                                   complexity=args.complexity, density=args.density, generator=args.generator,
+                                   planner=args.planner, near_radius=args.near_radius, far_every=args.far_every,
+                                   ai_budget_ms=args.ai_budget, analyze=args.analyze,
+                                   policy=args.policy, max_turns=args.max_turns):
+        if stats.games % args.report_every == 0 and stats.games < args.games:
+            print(json.dumps(stats.summary()), flush=True)
+    summary = stats.summary()
+    summary['seconds'] = time.perf_counter() - start
+    print(json.dumps(summary))
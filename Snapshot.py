@@ -0,0 +1,129 @@
+""" Saving and loading games
+    Snapshot file: fixed header, JSON with game settings and state, then raw arrays aligned to 64 bytes:
+        grid - uint8 codes of the map, one byte per cell (Maze.grid)
+        trolls - int32 rows of (y, x, direction number)
+    Grid is loaded with np.memmap (copy on write), so loading takes milliseconds whatever the size of the map
+    and only the touched pages are read from the disk; the file itself is never changed.
+    What reads the whole map is built later, when it's needed: portals of 'hpa' planner on the first search
+    (Game.hpa_graph), the index of free cells on the first spawn (Maze.free_cells).
+
+    usage: python Snapshot.py FILE - prints what's inside a snapshot
+"""
+import json
+import struct
+import sys
+
+import numpy as np
+from Game import Game, Troll
+from Maze import Maze
+
+MAGIC = b'TROLLSNP'
+VERSION = 1
+# magic, version, length of the JSON header
+HEAD = struct.Struct('<8sII')
+ALIGN = 64
+
+
+def aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def save_snapshot(game, path):
+    """ Writes game to path; Game.profiler and caches of path finding are not saved
+    """
+    if game.map.packed:
+        raise ValueError('Snapshot keeps uint8 grids; unpack the maze first')
+    grid = np.ascontiguousarray(game.map.grid, dtype=np.uint8)
+    trolls = np.array([(troll.coor[0], troll.coor[1], list(Game.directions).index(troll.direction))
+                       for troll in game.trolls], dtype=np.int32).reshape(-1, 3)
+    header = {'shape': list(game.map.shape),
+              'complexity': game.map.complexity,
+              'density': game.map.density,
+              'exit': [int(v) for v in game.map.exit],
+              'seed': game.seed,
+              'random': game.random.getstate(),
+              'planner': game.planner,
+              'scheduler': None if game.scheduler is None else
+                           {'near_radius': game.scheduler.near_radius, 'far_every': game.scheduler.far_every,
+                            'ai_budget_ms': game.scheduler.budget_ms},
+              'turn': game.turn,
+              'winning_turn': game.winning_turn,
+              'status': game.status,
+              'terrain_version': game.terrain_version,
+              'hero': [int(game.hero.coor[0]), int(game.hero.coor[1]), game.hero.direction],
+              'message': game.top_layer_map.text if game.top_layer_on else None,
+              'trolls': len(game.trolls)}
+    # offsets depend on the header length, which depends on the offsets; one more pass settles it
+    header['grid_offset'] = header['trolls_offset'] = 0
+    for i in range(2):
+        text = json.dumps(header).encode('utf-8')
+        header['grid_offset'] = aligned(HEAD.size + len(text) + 2 * ALIGN)
+        header['trolls_offset'] = aligned(header['grid_offset'] + grid.nbytes)
+    text = json.dumps(header).encode('utf-8')
+    with open(path, 'wb') as file:
+        file.write(HEAD.pack(MAGIC, VERSION, len(text)))
+        file.write(text)
+        file.seek(header['grid_offset'])
+        file.write(grid.tobytes())
+        file.seek(header['trolls_offset'])
+        file.write(trolls.tobytes())
+
+
+def read_header(path):
+    with open(path, 'rb') as file:
+        magic, version, length = HEAD.unpack(file.read(HEAD.size))
+        if magic != MAGIC:
+            raise ValueError('%s is not a snapshot' % path)
+        if version != VERSION:
+            raise ValueError('Snapshot version %d, only %d can be read' % (version, VERSION))
+        return json.loads(file.read(length).decode('utf-8'))
+
+
+def load_snapshot(path, planner=None):
+    """ Returns Game restored from path
+        Next turns are the same as they would be in the saved game with 'field' planner;
+        other planners search their plans again, so trolls may take other ways of the same length
+
+    planner: planner of the restored game, the saved one if None
+    """
+    header = read_header(path)
+    shape = tuple(header['shape'])
+    maze = Maze(0, 0)
+    maze.shape = shape
+    maze.complexity = header['complexity']
+    maze.density = header['density']
+    maze.exit = header['exit']
+    maze.grid = np.memmap(path, dtype=np.uint8, mode='c', offset=header['grid_offset'], shape=shape).view(np.ndarray)
+    game = Game(shape[1], shape[0], seed=header['seed'], planner=planner or header['planner'], maze=maze,
+                populate=False, **(header.get('scheduler') or {}))
+    game.hero.direction = header['hero'][2]
+    game.hero.coor = (header['hero'][0], header['hero'][1])
+    game.hero.occupancy = game.occupancy
+    game.occupancy.add(game.hero, game.hero.coor)
+    trolls = np.fromfile(path, dtype=np.int32, count=3 * header['trolls'],
+                         offset=header['trolls_offset']).reshape(-1, 3).tolist()
+    directions = list(Game.directions)
+    for y, x, direction in trolls:
+        troll = Troll(game)
+        troll.direction = directions[direction]
+        troll.coor = (y, x)
+        troll.occupancy = game.occupancy
+        game.occupancy.add(troll, troll.coor)
+        game.trolls.append(troll)
+    game.turn = header['turn']
+    game.winning_turn = header['winning_turn']
+    game.status = header['status']
+    game.terrain_version = header['terrain_version']
+    if header['message'] is not None:
+        game.top_layer_on = True
+        game.change_top_layer(text=header['message'])
+    random_state = header['random']
+    game.random.setstate((random_state[0], tuple(random_state[1]), random_state[2]))
+    game.refresh_entities()
+    return game
+
+
+if __name__ == '__main__':
+    for key, value in read_header(sys.argv[1]).items():
+        if key != 'random':
+            print('%-16s %s' % (key, value))
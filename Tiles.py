@@ -0,0 +1,165 @@
+""" Canvas front end: the map drawn with tiles instead of text
+    Tiles are canvas image items made once; between turns only items of changed cells get another image.
+    Hero and trolls are separate sprites sliding from cell to cell at a steady frame rate.
+"""
+import tkinter as tk
+from Game import Game
+
+
+class Tile_view:
+    """ tk.Canvas showing a frame of a Game or a Viewport (see Game.update_frame) with one image item per cell
+        Signs without a tile (text of stats and messages) are drawn as text items over a plain tile,
+        so are hero and troll signs where no sprite stands (letters of the text).
+
+    Attributes:
+        canvas: tk.Canvas
+        height, width: int; size in cells
+        tile: int; size of a tile in pixels
+        images: dict; sign: tk.PhotoImage; made once for every sign of Game.grid_elements
+        items: list of image item ids, one for every cell (row by row); made with the first frame
+        signs: list of signs of the last frame, one for every cell
+        labels: dict; cell index: text item id for signs without a tile
+        sprites: dict; key (see Game.sprites): [item id, y, x, code]
+        moves: list of [item id, x, y, dx, dy] of sprites sliding now; x, y are pixels of the target
+        frames_left: int; animation frames left to show
+        timer: id of the root.after call of the next animation frame or None
+    """
+    colors = {' ': '#141414', '#': '#6e6e6e', 'X': '#2ca02c', 'label': '#202048'}
+    hero_color = '#e8c020'
+    troll_color = '#d03030'
+    # signs drawn as sprites; their cells show the path tile
+    sprite_signs = {Game.grid_elements[code] for code in list(Game.directions.values()) + [7]}
+    steps = 6
+    frame_ms = 16
+
+    def __init__(self, root, height, width, tile=16):
+        self.height, self.width = height, width
+        self.tile = tile
+        self.canvas = tk.Canvas(root, width=width * tile, height=height * tile, background=self.colors[' '],
+                                borderwidth=0, highlightthickness=0)
+        self.images = self.make_images()
+        self.items = []
+        self.signs = []
+        self.labels = {}
+        self.sprites = {}
+        self.moves = []
+        self.frames_left = 0
+        self.timer = None
+
+    def make_images(self):
+        """ One PhotoImage for every sign: filled tiles for terrain, smaller shapes for hero and trolls,
+            hero has a dark mark on the side he faces
+        """
+        tile = self.tile
+        images = {}
+        for sign, color in Tile_view.colors.items():
+            images[sign] = tk.PhotoImage(width=tile, height=tile)
+            images[sign].put(color, to=(0, 0, tile, tile))
+        inset, mark = tile // 8, tile // 4
+        marks = {'^': (inset, inset, tile - inset, inset + mark),
+                 'v': (inset, tile - inset - mark, tile - inset, tile - inset),
+                 '<': (inset, inset, inset + mark, tile - inset),
+                 '>': (tile - inset - mark, inset, tile - inset, tile - inset)}
+        for sign, box in marks.items():
+            images[sign] = tk.PhotoImage(width=tile, height=tile)
+            images[sign].put(Tile_view.hero_color, to=(inset, inset, tile - inset, tile - inset))
+            images[sign].put('#000000', to=box)
+        images['t'] = tk.PhotoImage(width=tile, height=tile)
+        images['t'].put(Tile_view.troll_color, to=(inset, inset, tile - inset, tile - inset))
+        return images
+
+    def show(self, runs, texts, sprites, animate=True):
+        """ Shows a frame: runs and texts like Game_window.put_frame, sprites from Game.sprites
+            only cells with another sign get another image; hero and trolls moving by one cell slide
+            during the next steps frames, cells under them show the path
+
+        animate: boolean; False puts sprites at once (view moved, new game)
+        """
+        if runs is None:
+            lines = texts.split('\n')
+            runs = [(y, 0, len(line)) for y, line in enumerate(lines)]
+            texts = lines
+        if not self.items:
+            self.make_items()
+        old_cells = {(y, x) for item, y, x, code in self.sprites.values()}
+        self.move_sprites(sprites, animate)
+        cells = {(y, x) for item, y, x, code in self.sprites.values()}
+        for (y, x_start, x_end), text in zip(runs, texts):
+            for x, sign in zip(range(x_start, x_end), text):
+                self.set_sign(y, x, sign, (y, x) in cells)
+        # the same sign may need another image when a sprite came or left
+        for y, x in old_cells ^ cells:
+            self.set_sign(y, x, self.signs[y * self.width + x], (y, x) in cells, True)
+        self.canvas.tag_raise('sprite')
+        self.canvas.tag_raise('label')
+
+    def make_items(self):
+        tile = self.tile
+        self.items = [self.canvas.create_image(x * tile, y * tile, image=self.images[' '], anchor='nw', tags='tile')
+                      for y in range(self.height) for x in range(self.width)]
+        self.signs = [' '] * (self.height * self.width)
+
+    def set_sign(self, y, x, sign, under_sprite, again=False):
+        """ Gives the cell image of the sign; path if a sprite stands there, text item for signs without a tile
+        """
+        index = y * self.width + x
+        if self.signs[index] == sign and not again:
+            return
+        self.signs[index] = sign
+        shown = ' ' if under_sprite and sign in Tile_view.sprite_signs else sign
+        label = self.labels.pop(index, None)
+        if label is not None:
+            self.canvas.delete(label)
+        if shown not in self.images or shown in Tile_view.sprite_signs:
+            self.labels[index] = self.canvas.create_text((x + 0.5) * self.tile, (y + 0.5) * self.tile, text=shown,
+                                                         fill='white', font=('Lucida Console', self.tile * 3 // 4),
+                                                         tags='label')
+            shown = 'label'
+        self.canvas.itemconfigure(self.items[index], image=self.images[shown])
+
+    def move_sprites(self, sprites, animate):
+        self.finish()
+        tile = self.tile
+        seen = set()
+        for key, y, x, code in sprites:
+            seen.add(key)
+            image = self.images[Game.grid_elements[code]]
+            sprite = self.sprites.get(key)
+            if sprite is None:
+                item = self.canvas.create_image(x * tile, y * tile, image=image, anchor='nw', tags='sprite')
+                self.sprites[key] = [item, y, x, code]
+                continue
+            item, old_y, old_x, old_code = sprite
+            if code != old_code:
+                self.canvas.itemconfigure(item, image=image)
+            if (y, x) != (old_y, old_x):
+                if animate and abs(y - old_y) + abs(x - old_x) == 1:
+                    self.moves.append([item, x * tile, y * tile,
+                                       (x - old_x) * tile / self.steps, (y - old_y) * tile / self.steps])
+                else:
+                    self.canvas.coords(item, x * tile, y * tile)
+            sprite[1:] = [y, x, code]
+        for key in [key for key in self.sprites if key not in seen]:
+            self.canvas.delete(self.sprites.pop(key)[0])
+        if self.moves:
+            self.frames_left = self.steps
+            self.timer = self.canvas.after(self.frame_ms, self.next_frame)
+
+    def next_frame(self):
+        self.timer = None
+        self.frames_left -= 1
+        if not self.frames_left:
+            return self.finish()
+        for item, x, y, dx, dy in self.moves:
+            self.canvas.move(item, dx, dy)
+        self.timer = self.canvas.after(self.frame_ms, self.next_frame)
+
+    def finish(self):
+        """ Puts sliding sprites at their targets at once"""
+        if self.timer is not None:
+            self.canvas.after_cancel(self.timer)
+            self.timer = None
+        for item, x, y, dx, dy in self.moves:
+            self.canvas.coords(item, x, y)
+        self.moves = []
+        self.frames_left = 0
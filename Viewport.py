@@ -0,0 +1,171 @@
+""" Camera for maps bigger than the window
+    Only cells inside the view are rendered, so drawing costs the same on 60x25 and on 5000x5000 maps
+"""
+import numpy as np
+from Game import Game
+
+
+class Viewport:
+    """ Window of the map following the hero
+        Has the same frame interface as Game (frame, update_frame), so front ends draw either of them
+
+    Attributes:
+        game: Game object
+        height, width: int; size of the view in cells (not bigger than the map)
+        margin: int; camera moves when hero comes closer than that to the edge of the view
+        y, x: int; map coordinates of the top left corner of the view
+        frame: np.array of ascii codes of the view; every row ends with a new line sign
+        moved: boolean; view was moved since the frame was made, so it has to be built again
+        followed: hero coordinates when the view last followed him; view scrolled away stays till he moves
+        minimap_terrain: np.array of ascii codes or None; shading of walls for the minimap
+        minimap_version: Game.terrain_version of minimap_terrain
+    """
+    def __init__(self, game, height, width, margin=None):
+        self.game = game
+        self.height = min(height, game.map.shape[0])
+        self.width = min(width, game.map.shape[1])
+        self.margin = margin if margin is not None else min(self.height, self.width) // 4
+        self.y = self.x = 0
+        self.frame = None
+        self.moved = True
+        self.followed = game.hero.coor
+        self.minimap_terrain = None
+        self.minimap_version = None
+        self.center()
+
+    def move_to(self, y, x):
+        """ Puts top left corner of the view at (y, x), kept inside the map"""
+        y = max(0, min(y, self.game.map.shape[0] - self.height))
+        x = max(0, min(x, self.game.map.shape[1] - self.width))
+        if (y, x) != (self.y, self.x):
+            self.y, self.x = y, x
+            self.moved = True
+
+    def center(self):
+        hero_y, hero_x = self.game.hero.coor
+        self.move_to(hero_y - self.height // 2, hero_x - self.width // 2)
+
+    def follow(self):
+        """ Moves the view when the hero comes near its edge; hero out of sight (after scroll) is centered
+        """
+        hero_y, hero_x = self.game.hero.coor
+        y, x = hero_y - self.y, hero_x - self.x
+        if not (0 <= y < self.height and 0 <= x < self.width):
+            return self.center()
+        margin = self.margin
+        new_y, new_x = self.y, self.x
+        if y < margin:
+            new_y = hero_y - margin
+        elif y >= self.height - margin:
+            new_y = hero_y - self.height + margin + 1
+        if x < margin:
+            new_x = hero_x - margin
+        elif x >= self.width - margin:
+            new_x = hero_x - self.width + margin + 1
+        self.move_to(new_y, new_x)
+
+    def scroll(self, dy, dx):
+        self.move_to(self.y + dy, self.x + dx)
+
+    def overlays(self):
+        """ Like Game.overlays, but placed in the view: stats in its top left corner, message in its middle
+        """
+        game = self.game
+        overlays = []
+        if game.stats_map is not None:
+            overlays.append((1, 1, game.stats_map))
+        if game.top_layer_on:
+            text_map = game.top_layer_map
+            overlays.append((max(0, (self.height - text_map.shape[0]) // 2),
+                             max(0, (self.width - text_map.shape[1]) // 2), text_map))
+        return overlays
+
+    def render_frame(self):
+        """ Ascii codes of the view: map, hero and trolls inside it, overlays cut to the view
+        """
+        game = self.game
+        y_end, x_end = self.y + self.height, self.x + self.width
+        frame = np.empty((self.height, self.width + 1), dtype=np.uint8)
+        frame[:, :-1] = Game.grid_lut[game.map.grid[self.y:y_end, self.x:x_end]]
+        frame[:, -1] = ord('\n')
+        for (y, x), entities in game.occupancy.in_rect(self.y, self.x, y_end, x_end).items():
+            frame[y - self.y, x - self.x] = Game.grid_lut[game.entities_value(entities)]
+        for y_start, x_start, text_map in self.overlays():
+            chars = text_map.chars[:self.height - y_start, :self.width - x_start]
+            frame[y_start:y_start + chars.shape[0], x_start:x_start + chars.shape[1]] = chars
+        return frame
+
+    def update_frame(self):
+        """ Same contract as Game.update_frame: returns [y, x_start, x_end] runs of changed signs
+            or None if the whole view was built again (view moved, new message)
+            The view is rendered every time and compared with the last one, which costs the size of the view
+        """
+        game = self.game
+        if game.hero.coor != self.followed:
+            # only hero moves bring the camera back, so scroll isn't undone by the next frame
+            self.followed = game.hero.coor
+            self.follow()
+        frame = self.render_frame()
+        # Game's own dirty cells are for its full frame; the view doesn't need them
+        game.dirty.clear()
+        if self.frame is None or self.moved or game.full_redraw:
+            game.full_redraw = False
+            self.moved = False
+            self.frame = frame
+            return None
+        changed = frame != self.frame
+        self.frame = frame
+        runs = []
+        for y in np.flatnonzero(changed.any(axis=1)):
+            xs = np.flatnonzero(changed[y])
+            runs.append([int(y), int(xs[0]), int(xs[-1]) + 1])
+        return runs
+
+    def sprites(self):
+        """ Game.sprites inside the view, coordinates relative to the view"""
+        covered = [(y_start, x_start, y_start + text_map.shape[0], x_start + text_map.shape[1])
+                   for y_start, x_start, text_map in self.overlays()]
+        return self.game.sprites(self.y, self.x, self.y + self.height, self.x + self.width, covered)
+
+    def minimap(self, height, width):
+        """ Text of the whole map shrunk to about height x width signs
+            '#' - mostly walls, '+' - some walls, ' ' - open, X - exit, hero sign, '.' - edges of the view
+        """
+        game = self.game
+        map_height, map_width = game.map.shape
+        block_y, block_x = -(-map_height // height), -(-map_width // width)
+        if self.minimap_terrain is None:
+            self.minimap_terrain = self.shade(0, 0, map_height, map_width, block_y, block_x)
+        elif self.minimap_version != game.terrain_version:
+            # walls are pushed only next to the hero
+            hero_y, hero_x = game.hero.coor
+            top, left = max(0, hero_y - 2) // block_y, max(0, hero_x - 2) // block_x
+            bottom, right = min(map_height - 1, hero_y + 2) // block_y, min(map_width - 1, hero_x + 2) // block_x
+            self.minimap_terrain[top:bottom + 1, left:right + 1] = self.shade(
+                top * block_y, left * block_x, min(map_height, (bottom + 1) * block_y),
+                min(map_width, (right + 1) * block_x), block_y, block_x)
+        self.minimap_version = game.terrain_version
+        signs = self.minimap_terrain.copy()
+        top, left = self.y // block_y, self.x // block_x
+        bottom, right = (self.y + self.height - 1) // block_y, (self.x + self.width - 1) // block_x
+        signs[top, left:right + 1] = signs[bottom, left:right + 1] = ord('.')
+        signs[top:bottom + 1, left] = signs[top:bottom + 1, right] = ord('.')
+        if game.map.exit:
+            signs[game.map.exit[0] // block_y, game.map.exit[1] // block_x] = ord('X')
+        signs[game.hero.coor[0] // block_y, game.hero.coor[1] // block_x] = \
+            Game.grid_lut[Game.directions[game.hero.direction]]
+        return '\n'.join(row.tobytes().decode('ascii') for row in signs)
+
+    def shade(self, y_start, x_start, y_end, x_end, block_y, block_x):
+        """ Minimap signs for the part of the map; blocks of block_y x block_x cells, smaller ones at the edges"""
+        grid = self.game.map.grid[y_start:y_end, x_start:x_end]
+        # walls are counted in one row of blocks at a time, so only that much of the map is compared at once;
+        # cells of the blocks come from their sizes
+        row_starts = np.arange(0, grid.shape[0], block_y)
+        column_starts = np.arange(0, grid.shape[1], block_x)
+        columns = np.stack([(grid[start:start + block_y] == 1).sum(axis=0, dtype=np.int32) for start in row_starts])
+        counts = np.add.reduceat(columns, column_starts, axis=1)
+        heights = np.diff(np.append(row_starts, grid.shape[0]))
+        widths = np.diff(np.append(column_starts, grid.shape[1]))
+        share = counts / np.outer(heights, widths)
+        return np.select([share > 2 / 3, share > 1 / 3], [ord('#'), ord('+')], ord(' ')).astype(np.uint8)
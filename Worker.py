@@ -0,0 +1,125 @@
+""" Background threads of the front end
+    Turn_worker plays turns of a Game: front end only puts actions in and takes finished turns out,
+    so its event loop never waits for trolls_action or rendering.
+    Level_pool generates next games ahead, so restart doesn't wait for a new maze.
+"""
+import queue
+import random
+import threading
+
+from Game import Game
+
+
+def frame_texts(frame, runs):
+    """ Text of the frame parts listed in runs (see Game.update_frame)
+        returns list of strings, one for every run, or text of the whole frame if runs is None
+    """
+    if runs is None:
+        return frame.tobytes().decode('ascii').rstrip('\n')
+    return [frame[y, x_start:x_end].tobytes().decode('ascii') for y, x_start, x_end in runs]
+
+
+class Turn_worker:
+    """ Plays Game turns in a daemon thread, one action at a time in the order of submit calls
+        Every finished turn is published with the changed parts of the frame already copied to strings,
+        so front end doesn't read the game while the next turn is played
+
+    Attributes:
+        game: Game object; may be replaced only when no turn is being played
+        screen: object with update_frame and frame - the game itself or its Viewport; replaced like game
+        requests: queue.Queue of actions for the thread; Turn_worker.stop_request ends it
+        results: queue.Queue of finished turns: (state, runs, texts, sprites) - see Game.state, Game.update_frame,
+                 frame_texts, Game.sprites (None unless with_sprites)
+        with_sprites: boolean; positions of hero and trolls are published too, for animated front ends
+        error: exception raised in the thread or None; raised again by finished
+        thread: threading.Thread
+    """
+    stop_request = object()
+
+    def __init__(self, game):
+        self.game = game
+        self.screen = game
+        self.with_sprites = False
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, action):
+        """ Queues one hero action (one of Game.directions keys, None for waiting)"""
+        self.requests.put(action)
+
+    def finished(self):
+        """ Returns list of turns finished since the last call; never blocks"""
+        if self.error is not None:
+            raise self.error
+        turns = []
+        while True:
+            try:
+                turns.append(self.results.get_nowait())
+            except queue.Empty:
+                return turns
+
+    def stop(self):
+        self.requests.put(Turn_worker.stop_request)
+        self.thread.join()
+
+    def run(self):
+        while True:
+            action = self.requests.get()
+            if action is Turn_worker.stop_request:
+                return
+            try:
+                state = self.game.step(action)
+                runs = self.screen.update_frame()
+                sprites = self.screen.sprites() if self.with_sprites else None
+                texts = frame_texts(self.screen.frame, runs)
+                if self.game.profiler is not None:
+                    self.game.profiler.lap('render')
+                self.results.put((state, runs, texts, sprites))
+            except Exception as error:
+                self.error = error
+                return
+
+
+class Level_pool:
+    """ Games ready to be played, generated in a daemon thread
+        The thread keeps up to size games waiting; take gives one at once if it is ready
+        With analyze among the settings bad levels (see Maze_analysis.problems) are thrown away
+
+    Attributes:
+        settings: dict of Game arguments (seed excluded); every game gets its own seed, see Game.seed
+        max_tries: int; levels generated at most for one game, the last one is kept even if it is bad
+        levels: queue.Queue of ready games
+        seeds: random.Random; source of the seeds
+        thread: threading.Thread
+    """
+    def __init__(self, size=1, max_tries=8, **settings):
+        self.settings = settings
+        self.max_tries = max_tries
+        self.levels = queue.Queue(size)
+        self.seeds = random.Random()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def new_level(self):
+        for tries in range(self.max_tries):
+            game = Game(seed=self.seeds.getrandbits(32), **self.settings)
+            if game.analysis is None or not game.analysis.problems(game.hero.coor):
+                break
+        if game.planner == 'hpa':
+            # portals and their distances take seconds on big maps; better here than in the first turn
+            game.hpa_graph()
+        return game
+
+    def run(self):
+        while True:
+            self.levels.put(self.new_level())
+
+    def take(self):
+        """ Returns a ready game; generates one here if the thread hasn't finished it yet"""
+        try:
+            return self.levels.get_nowait()
+        except queue.Empty:
+            return self.new_level()
@@ -0,0 +1,59 @@
+""" Benchmark of Pathfinding.astar (used by Troll.find_path)
+    Runs searches between random free cells of generated mazes and prints expansions per second
+
+    usage: python benchmarks/bench_astar.py [--searches N] [--seed SEED]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Maze import Maze
+from Pathfinding import DIRECTIONS, astar, passable_cells
+
+# (width, height, generator)
+SIZES = [(60, 25, 'classic'),
+         (250, 250, 'walk'),
+         (1000, 1000, 'walk')]
+
+
+def make_maze(width, height, generator, seed):
+    maze = Maze(width, height)
+    maze.fill_borders()
+    maze.make_aisles(generator, seed)
+    maze.set_exit()
+    return maze
+
+
+def bench(maze, searches, seed):
+    rng = random.Random(seed)
+    passable = passable_cells(maze.grid)
+    free = np.argwhere(maze.grid == 0)
+    expansions = 0
+    found = 0
+    start_time = time.perf_counter()
+    for i in range(searches):
+        start, goal = (tuple(int(v) for v in free[rng.randrange(len(free))]) for j in range(2))
+        path, n = astar(passable, maze.shape[1], start, rng.choice(DIRECTIONS), goal)
+        expansions += n
+        found += bool(path)
+    elapsed = time.perf_counter() - start_time
+    return expansions, found, elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--searches', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print('%-12s %10s %8s %10s %14s' % ('maze', 'expansions', 'found', 'seconds', 'expansions/s'))
+    for width, height, generator in SIZES:
+        maze = make_maze(width, height, generator, args.seed)
+        expansions, found, elapsed = bench(maze, args.searches, args.seed)
+        print('%-12s %10d %8s %10.3f %14.0f' % ('%dx%d' % (width, height), expansions,
+                                                '%d/%d' % (found, args.searches), elapsed, expansions / elapsed))
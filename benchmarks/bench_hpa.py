@@ -0,0 +1,60 @@
+""" Benchmark of Pathfinding.Cluster_graph (used by trolls with 'hpa' planner)
+    Builds portals of a big maze, then searches from random free cells to one goal - like trolls chasing
+    the hero - and prints latency of the first (cold) and the repeated (warm) searches
+
+    usage: python benchmarks/bench_hpa.py [--size N] [--generator NAME] [--searches N] [--seed SEED]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Maze import Maze
+from Pathfinding import DIRECTIONS, Cluster_graph
+
+
+def latencies(graph, starts, goal):
+    """ Returns list of (milliseconds, found) for every start"""
+    results = []
+    for start, direction in starts:
+        start_time = time.perf_counter()
+        path, n = graph.search(start, direction, goal)
+        results.append((1000 * (time.perf_counter() - start_time), bool(path)))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=2000)
+    parser.add_argument('--generator', default='walk')
+    parser.add_argument('--cluster-size', type=int, default=16)
+    parser.add_argument('--weight', type=float, default=None, help='weight of the heuristic (Cluster_graph.weight)')
+    parser.add_argument('--searches', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    maze = Maze(args.size, args.size)
+    maze.fill_borders()
+    maze.make_aisles(args.generator, args.seed)
+    start_time = time.perf_counter()
+    graph = Cluster_graph(maze.grid, args.cluster_size)
+    if args.weight is not None:
+        graph.weight = args.weight
+    print('portals of %dx%d maze: %d in %.3f s' % (maze.shape[1], maze.shape[0], len(graph.links),
+                                                   time.perf_counter() - start_time))
+
+    rng = random.Random(args.seed)
+    free = np.argwhere(maze.grid == 0)
+    goal = tuple(int(v) for v in free[rng.randrange(len(free))])
+    starts = [(tuple(int(v) for v in free[rng.randrange(len(free))]), rng.choice(DIRECTIONS))
+              for i in range(args.searches)]
+    print('%-6s %10s %10s %10s %8s' % ('', 'median ms', 'p90 ms', 'max ms', 'found'))
+    for name in ('cold', 'warm'):
+        results = latencies(graph, starts, goal)
+        ms = np.array([result[0] for result in results])
+        print('%-6s %10.1f %10.1f %10.1f %8s' % (name, np.median(ms), np.percentile(ms, 90), ms.max(),
+                                                  '%d/%d' % (sum(result[1] for result in results), len(results))))
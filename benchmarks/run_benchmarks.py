@@ -0,0 +1,164 @@
+""" Benchmark suite for the hot paths of the game; no display needed
+    Every case runs on fixed seeds for every map size (and troll count where it matters),
+    time (best of repeats) and peak memory (tracemalloc) are written as JSON
+
+    usage: python benchmarks/run_benchmarks.py [--sizes 60x25 250x250] [--trolls 15 150]
+                                               [--output results.json] [--baseline baseline.json]
+    with --baseline cases slower than baseline * --threshold (and by more than --min-difference) are listed
+    and exit code is 1
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Game import Game
+from Maze import Maze
+
+SIZES = ['60x25', '250x250', '1000x1000']
+TROLLS = [15, 150, 1500]
+SEED = 0
+
+
+def generator_for(width, height):
+    # classic generator takes minutes beyond a few hundred cells
+    return 'classic' if width * height <= 60 * 25 else 'walk'
+
+
+def measure(function, prepare=None, min_time=0.2, max_repeats=20):
+    """ Returns (best time of a run in seconds, number of runs, peak of traced memory in bytes)
+        prepare is called before every run and is not measured
+    """
+    times = []
+    while len(times) < max_repeats and sum(times) < min_time:
+        if prepare:
+            prepare()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    if prepare:
+        prepare()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), len(times), peak
+
+
+def make_game(width, height, trolls):
+    game = Game(width, height, trolls, generator=generator_for(width, height), seed=SEED)
+    game.start()
+    return game
+
+
+def bench_make_aisles(width, height):
+    maze = Maze(width, height)
+
+    def prepare():
+        maze.grid[:, :] = 0
+        maze.fill_borders()
+    return measure(lambda: maze.make_aisles(generator_for(width, height), SEED), prepare)
+
+
+def bench_find_path(game):
+    troll = game.trolls[0]
+    return measure(troll.find_path)
+
+
+def bench_trolls_action(game):
+    states = [(troll.coor, troll.direction) for troll in game.trolls]
+
+    def prepare():
+        # every run starts from the same positions and searches again
+        for troll, (coor, direction) in zip(game.trolls, states):
+            troll.place(coor)
+            troll.direction = direction
+        game.field = None
+    return measure(game.trolls_action, prepare)
+
+
+def bench_refresh_entities(game):
+    """ Dirty cells of one turn of troll moves and patching the frame with them"""
+    states = [(troll.coor, troll.direction) for troll in game.trolls]
+
+    def prepare():
+        for troll, (coor, direction) in zip(game.trolls, states):
+            troll.place(coor)
+            troll.direction = direction
+        game.refresh_entities()
+        game.update_frame()
+        # trolls move, so occupancy.changed has their cells like after a real turn
+        game.trolls_action()
+
+    def function():
+        game.refresh_entities()
+        game.update_frame()
+    return measure(function, prepare)
+
+
+def bench_render(game):
+    return measure(game.__str__)
+
+
+def run(sizes, troll_counts):
+    results = []
+
+    def add(case, size, trolls, measured):
+        seconds, repeats, peak = measured
+        results.append({'case': case, 'size': size, 'trolls': trolls,
+                        'seconds': seconds, 'repeats': repeats, 'peak_bytes': peak})
+        print('%-18s %-10s %6s %12.6f s %12d B' % (case, size, trolls, seconds, peak), file=sys.stderr)
+
+    for size in sizes:
+        width, height = (int(n) for n in size.split('x'))
+        add('make_aisles', size, None, bench_make_aisles(width, height))
+        for trolls in troll_counts:
+            game = make_game(width, height, trolls)
+            if trolls == troll_counts[0]:
+                add('find_path', size, None, bench_find_path(game))
+            add('trolls_action', size, trolls, bench_trolls_action(game))
+            add('refresh_entities', size, trolls, bench_refresh_entities(game))
+            add('render', size, trolls, bench_render(game))
+    return results
+
+
+def compare(results, baseline, threshold, min_difference=0.0):
+    """ Returns list of (result, baseline seconds) of cases slower than baseline * threshold
+        differences up to min_difference seconds are taken as noise, timer resolution decides very short cases
+    """
+    known = {(record['case'], record['size'], record['trolls']): record['seconds'] for record in baseline}
+    slower = []
+    for record in results:
+        base = known.get((record['case'], record['size'], record['trolls']))
+        if base and record['seconds'] > base * threshold and record['seconds'] - base > min_difference:
+            slower.append((record, base))
+    return slower
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=SIZES)
+    parser.add_argument('--trolls', nargs='+', type=int, default=TROLLS)
+    parser.add_argument('--output', help='write results to this file instead of stdout')
+    parser.add_argument('--baseline', help='results of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=1.25, help='allowed slowdown against baseline')
+    parser.add_argument('--min-difference', type=float, default=50e-6,
+                        help='slowdowns smaller than this many seconds are ignored')
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.trolls)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=1)
+    else:
+        print(json.dumps(results, indent=1))
+    if args.baseline:
+        with open(args.baseline) as file:
+            slower = compare(results, json.load(file), args.threshold, args.min_difference)
+        for record, base in slower:
+            print('SLOWER %s %s trolls=%s: %.6f s (baseline %.6f s)' % (
+                record['case'], record['size'], record['trolls'], record['seconds'], base), file=sys.stderr)
+        sys.exit(1 if slower else 0)